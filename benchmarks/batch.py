@@ -0,0 +1,73 @@
+"""
+runtime_context.map() compared with the naive loop
+
+    for region, tenant in contexts:
+        with env(region=region, tenant=tenant):
+            job()
+
+for 10 regions x 1000 tenants, with a context_var_set listener that
+reloads region config (simulated with 50 us of work) whenever region is set.
+
+    python -m benchmarks.batch
+"""
+import concurrent.futures
+import time
+
+from runtime_context import runtime_context_env
+
+REGIONS = ['region-{}'.format(i) for i in range(10)]
+TENANTS = ['tenant-{}'.format(i) for i in range(1000)]
+
+
+@runtime_context_env
+class Env:
+    region = None
+    tenant = None
+    region_config = None
+
+
+env = Env()
+
+
+@env.context_var_set.listener(predicate=lambda name: name == 'region')
+def reload_region_config():
+    deadline = time.perf_counter() + 0.00005
+    while time.perf_counter() < deadline:
+        pass
+    env.region_config = {'region': env.region}
+
+
+def job():
+    return env.region_config['region'] == env.region
+
+
+def naive():
+    results = []
+    for tenant in TENANTS:
+        for region in REGIONS:
+            with env(region=region, tenant=tenant):
+                results.append(job())
+    return results
+
+
+def with_map(executor=None):
+    contexts = [[{'region': region}, {'tenant': tenant}] for tenant in TENANTS for region in REGIONS]
+    return [result for _, result in env.runtime_context.map(job, contexts, executor=executor, chunksize=100)]
+
+
+def bench(func):
+    started = time.perf_counter()
+    results = func()
+    assert len(results) == len(REGIONS) * len(TENANTS) and all(results)
+    return time.perf_counter() - started
+
+
+def main():
+    print('{:>26}: {:.3f} s'.format('naive loop', bench(naive)))
+    print('{:>26}: {:.3f} s'.format('map()', bench(with_map)))
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        print('{:>26}: {:.3f} s'.format('map(), 4 threads', bench(lambda: with_map(executor))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Interleaved consumption of many bound generators: 1000 generators created
+in different contexts are consumed round-robin, 100 steps each.
+
+Unbound generators are included to show the cost of a plain step;
+they see the consumer's stack instead of their own.
+
+    python -m benchmarks.bound_iter
+"""
+import time
+
+from runtime_context import RuntimeContextWrapper
+
+GENERATORS = 1000
+STEPS = 100
+
+runtime_context = RuntimeContextWrapper()
+
+
+def stream():
+    for _ in range(STEPS):
+        yield runtime_context.get('tenant')
+
+
+def consume(generators):
+    started = time.perf_counter()
+    wrong = 0
+    for _ in range(STEPS):
+        for tenant, generator in generators:
+            if next(generator) != tenant:
+                wrong += 1
+    return (time.perf_counter() - started) / (GENERATORS * STEPS), wrong
+
+
+def main():
+    unbound = []
+    bound = []
+    for i in range(GENERATORS):
+        tenant = 'tenant-{}'.format(i)
+        with runtime_context(tenant=tenant):
+            unbound.append((tenant, stream()))
+            bound.append((tenant, runtime_context.bind_iter(stream())))
+
+    for name, generators in [('unbound', unbound), ('bound', bound)]:
+        seconds, wrong = consume(generators)
+        print('{:>8}: {:.2f} us per step, {} of {} steps saw the wrong tenant'.format(
+            name, seconds * 1e6, wrong, GENERATORS * STEPS,
+        ))
+
+
+if __name__ == '__main__':
+    main()
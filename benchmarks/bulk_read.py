@@ -0,0 +1,57 @@
+"""
+Reading 8 env vars one by one vs. with env.read() and a precompiled reader.
+
+    python -m benchmarks.bulk_read
+"""
+import time
+
+from runtime_context import runtime_context_env
+
+N = 100000
+
+NAMES = ('tenant', 'dry_run', 'db_name', 'region', 'request_id', 'user_id', 'locale', 'debug')
+
+
+@runtime_context_env
+class Env:
+    tenant = None
+    dry_run = False
+    db_name = None
+    region = None
+    request_id = None
+    user_id = None
+    locale = 'en'
+    debug = False
+
+
+env = Env()
+
+
+def one_by_one():
+    return (env.tenant, env.dry_run, env.db_name, env.region, env.request_id, env.user_id, env.locale, env.debug)
+
+
+def bench(func):
+    started = time.perf_counter()
+    for _ in range(N):
+        func()
+    return (time.perf_counter() - started) / N
+
+
+def main():
+    reader = env.reader(*NAMES)
+    with env(tenant='acme', db_name='products', region='eu'):
+        with env(request_id='abc', user_id=1):
+            with env(dry_run=True):
+                assert one_by_one() == env.read(*NAMES) == reader()
+                results = [
+                    ('attributes one by one', bench(one_by_one)),
+                    ('env.read(*names)', bench(lambda: env.read(*NAMES))),
+                    ('precompiled reader', bench(reader)),
+                ]
+    for name, seconds in results:
+        print('{:>24}: {:.2f} us'.format(name, seconds * 1e6))
+
+
+if __name__ == '__main__':
+    main()
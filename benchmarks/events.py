@@ -0,0 +1,124 @@
+"""
+Built-in events compared with hookery, which they replaced:
+import time, wrapper construction, and dispatch.
+
+hookery is only needed for the comparison, without it only the built-in events are measured.
+
+    python -m benchmarks.events [BASELINE_REF]
+
+The import row compares importing runtime_context from this tree with importing it from
+BASELINE_REF, a git revision that still uses hookery (for example, the parent of the commit
+that added runtime_context/events.py). Without it, the baseline import isn't measured.
+"""
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from runtime_context import RuntimeContextWrapper, runtime_context_env
+from runtime_context.events import Event
+
+try:
+    import hookery
+except ImportError:
+    hookery = None
+
+N = 100000
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_time(module, cwd):
+    # python -c puts cwd first on sys.path, so the package in cwd is the one imported
+    code = 'import time; started = time.perf_counter(); import {}; print(time.perf_counter() - started)'.format(module)
+    runs = [float(subprocess.check_output([sys.executable, '-c', code], cwd=cwd)) for _ in range(10)]
+    return min(runs)
+
+
+def baseline_import_time(ref):
+    """
+    Import time of runtime_context as of git revision ``ref``.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = os.path.join(tmp, 'baseline.tar')
+        subprocess.check_call(['git', 'archive', '-o', archive, ref, 'runtime_context'], cwd=ROOT)
+        with tarfile.open(archive) as tar:
+            tar.extractall(tmp)
+        return import_time('runtime_context', tmp)
+
+
+def bench(func, n=N):
+    started = time.perf_counter()
+    for _ in range(n):
+        func()
+    return (time.perf_counter() - started) / n
+
+
+def hookery_wrapper_events():
+    # What RuntimeContextWrapper.__init__ used to create
+    registry = hookery.Registry()
+    registry.register_event('context_entered')
+    registry.register_event('context_exited')
+
+
+def builtin_wrapper_events():
+    Event('context_entered')
+    Event('context_exited')
+
+
+def dispatch_bench(event):
+    @event.listener
+    def on_set(name):
+        pass
+
+    @event.listener(predicate=lambda name: name == 'config_file')
+    def on_config_file_set():
+        pass
+
+    return bench(lambda: event(name='db_name', lazy=False))
+
+
+def make_env_cls():
+    @runtime_context_env
+    class Env:
+        x = None
+
+    return Env
+
+
+def main():
+    baseline_ref = sys.argv[1] if len(sys.argv) > 1 else None
+    rows = [
+        ('import runtime_context', import_time('runtime_context', ROOT),
+         baseline_ref and hookery and baseline_import_time(baseline_ref)),
+        ('construct wrapper events', bench(builtin_wrapper_events), hookery and bench(hookery_wrapper_events)),
+        ('dispatch, 2 listeners', dispatch_bench(Event('context_var_set')),
+         hookery and dispatch_bench(hookery.Registry().register_event('context_var_set'))),
+    ]
+
+    print('{:>28}  {:>12}  {:>12}'.format('', 'built-in', 'hookery'))
+    for name, builtin, with_hookery in rows:
+        print('{:>28}  {:>9.2f} us  {:>12}'.format(
+            name, builtin * 1e6, '-' if with_hookery is None else '{:.2f} us'.format(with_hookery * 1e6),
+        ))
+
+    print()
+    print('construct RuntimeContextWrapper: {:.2f} us'.format(bench(RuntimeContextWrapper, 10000) * 1e6))
+
+    # Every env instance adds listeners to the wrapper of its class, so use a fresh class for each measurement.
+    print('construct env: {:.2f} us'.format(bench(make_env_cls(), 10000) * 1e6))
+
+    env = make_env_cls()()
+
+    def push_pop():
+        with env(x=1):
+            pass
+
+    print('env push + pop: {:.2f} us'.format(bench(push_pop) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Memory of preforked workers with and without freeze_defaults().
+
+The parent loads a large env default (a tenant map) and forks 8 workers.
+Each worker reads a few env vars and runs a garbage collection, as any
+long-running worker eventually does, then reports its memory from
+/proc/self/smaps_rollup while all workers are alive. Linux only.
+
+    python -m benchmarks.fork_memory
+"""
+import gc
+import json
+import os
+import subprocess
+import sys
+
+from runtime_context import runtime_context_env
+from runtime_context.fork import enable_fork_reset, freeze_defaults
+
+WORKERS = 8
+TENANTS = 200000
+
+
+def memory():
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Pss', 'Private_Dirty'):
+                values[name] = int(value.split()[0])
+    return values
+
+
+def run(freeze):
+    @runtime_context_env
+    class Env:
+        tenants = {i: {'name': 'tenant-{}'.format(i), 'flags': [i % 2 == 0, i % 3 == 0]} for i in range(TENANTS)}
+        tenant_id = None
+
+    env = Env()
+
+    enable_fork_reset()
+    if freeze:
+        freeze_defaults()
+
+    release_r, release_w = os.pipe()
+    children = []
+    for i in range(WORKERS):
+        report_r, report_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(release_w)
+            with env(tenant_id=i):
+                assert env.tenants[env.tenant_id]['name'] == 'tenant-{}'.format(i)
+            gc.collect()
+            os.write(report_w, json.dumps(memory()).encode())
+            os.close(report_w)
+            os.read(release_r, 1)  # wait until all workers have reported
+            os._exit(0)
+        os.close(report_w)
+        children.append((pid, report_r))
+
+    reports = []
+    for pid, report_r in children:
+        with os.fdopen(report_r) as f:
+            reports.append(json.loads(f.read()))
+    os.close(release_w)
+    for pid, _ in children:
+        os.waitpid(pid, 0)
+
+    print('{:>22}: per worker Rss {:.1f} MB, Pss {:.1f} MB, Private_Dirty {:.1f} MB'.format(
+        'freeze_defaults()' if freeze else 'without freezing',
+        *(sum(report[name] for report in reports) / len(reports) / 1024 for name in ('Rss', 'Pss', 'Private_Dirty'))
+    ))
+
+
+def main():
+    if len(sys.argv) > 1:
+        run(freeze=sys.argv[1] == 'freeze')
+        return
+    # Each mode runs in its own process as gc.freeze() affects the whole process.
+    for mode in ['plain', 'freeze']:
+        subprocess.check_call([sys.executable, '-m', 'benchmarks.fork_memory', mode])
+
+
+if __name__ == '__main__':
+    main()
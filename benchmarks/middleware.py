@@ -0,0 +1,100 @@
+"""
+Per-request overhead of WSGIMiddleware and ASGIMiddleware.
+
+Runs a local stand-in application with and without the middleware and reports
+the difference per request. Run from the project root:
+
+    python -m benchmarks.middleware
+"""
+import asyncio
+import time
+
+from runtime_context import runtime_context_env
+from runtime_context.middleware import ASGIMiddleware, WSGIMiddleware
+
+N = 100000
+
+HEADERS = {'X-Tenant': 'tenant', 'X-Request-Id': 'request_id', 'X-Dry-Run': 'dry_run'}
+
+
+@runtime_context_env
+class Env:
+    tenant = None
+    request_id = None
+    dry_run = None
+
+
+env = Env()
+
+
+def wsgi_app(environ, start_response):
+    start_response('200 OK', [])
+    return [env.tenant.encode()]
+
+
+async def asgi_app(scope, receive, send):
+    await send(env.tenant)
+
+
+def start_response(status, headers):
+    pass
+
+
+async def send(message):
+    pass
+
+
+def bench_wsgi(app):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': '/',
+        'HTTP_X_TENANT': 'acme',
+        'HTTP_X_REQUEST_ID': '0123456789abcdef',
+        'HTTP_X_DRY_RUN': '1',
+        'HTTP_ACCEPT': '*/*',
+        'HTTP_USER_AGENT': 'bench',
+    }
+    started = time.perf_counter()
+    for _ in range(N):
+        app(environ, start_response)
+    return (time.perf_counter() - started) / N
+
+
+def bench_asgi(app):
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/',
+        'headers': [
+            (b'x-tenant', b'acme'),
+            (b'x-request-id', b'0123456789abcdef'),
+            (b'x-dry-run', b'1'),
+            (b'accept', b'*/*'),
+            (b'user-agent', b'bench'),
+        ],
+    }
+
+    async def run():
+        started = time.perf_counter()
+        for _ in range(N):
+            await app(scope, None, send)
+        return (time.perf_counter() - started) / N
+
+    return asyncio.run(run())
+
+
+def main():
+    with env(tenant='acme'):
+        bare_wsgi = bench_wsgi(wsgi_app)
+        bare_asgi = bench_asgi(asgi_app)
+    wrapped_wsgi = bench_wsgi(WSGIMiddleware(wsgi_app, env, headers=HEADERS))
+    wrapped_asgi = bench_asgi(ASGIMiddleware(asgi_app, env, headers=HEADERS))
+
+    for name, bare, wrapped in [('wsgi', bare_wsgi, wrapped_wsgi), ('asgi', bare_asgi, wrapped_asgi)]:
+        print('{}: bare {:.2f} us/request, with middleware {:.2f} us/request, overhead {:.2f} us/request'.format(
+            name, bare * 1e6, wrapped * 1e6, (wrapped - bare) * 1e6,
+        ))
+
+
+if __name__ == '__main__':
+    main()
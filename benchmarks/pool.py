@@ -0,0 +1,80 @@
+"""
+Resource reuse under concurrency: 16 threads handle requests for 4 databases,
+each request needs a connection that takes 1 ms to open.
+
+    python -m benchmarks.pool
+"""
+import itertools
+import threading
+import time
+
+from runtime_context import runtime_context_env
+
+THREADS = 16
+REQUESTS_PER_THREAD = 200
+DB_NAMES = ['products', 'orders', 'customers', 'stock']
+
+opened = itertools.count()
+
+
+class FakeConnection:
+    def __init__(self, db_name):
+        next(opened)
+        time.sleep(0.001)
+        self.db_name = db_name
+
+    def query(self):
+        time.sleep(0.0001)
+
+    def close(self):
+        pass
+
+
+@runtime_context_env
+class Env:
+    db_name = None
+
+
+env = Env()
+db = env.pool('db', key=('db_name',), factory=FakeConnection, maxsize=8)
+
+
+def run(handle_request):
+    def worker(i):
+        with env.runtime_context.isolated():
+            for j in range(REQUESTS_PER_THREAD):
+                with env(db_name=DB_NAMES[(i + j) % len(DB_NAMES)]):
+                    handle_request()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def fresh_connection():
+    conn = FakeConnection(env.db_name)
+    conn.query()
+    conn.close()
+
+
+def pooled_connection():
+    with db.borrow() as conn:
+        conn.query()
+
+
+def main():
+    global opened
+    for name, handle_request in [('fresh connection per request', fresh_connection), ('pooled', pooled_connection)]:
+        opened = itertools.count()
+        seconds = run(handle_request)
+        print('{:>30}: {:.2f} s, {} connections opened for {} requests'.format(
+            name, seconds, next(opened), THREADS * REQUESTS_PER_THREAD,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Cost of the transition recorder on push/pop and set.
+
+    python -m benchmarks.recorder
+"""
+import time
+
+from runtime_context import RuntimeContextWrapper
+from runtime_context.recorder import Recorder
+
+N = 200000
+
+
+def bench(rc):
+    started = time.perf_counter()
+    for i in range(N):
+        with rc(tenant='acme', request_id=i):
+            rc.set('dry_run', True)
+    return (time.perf_counter() - started) / N
+
+
+def main():
+    rc = RuntimeContextWrapper()
+    recorder = Recorder(capacity=65536)
+    without = with_recorder = float('inf')
+    for _ in range(3):
+        without = min(without, bench(rc))
+        recorder.attach(rc)
+        with_recorder = min(with_recorder, bench(rc))
+        recorder.detach(rc)
+
+    print('push + set + pop: {:.2f} us without recorder, {:.2f} us with recorder, overhead {:.2f} us'.format(
+        without * 1e6, with_recorder * 1e6, (with_recorder - without) * 1e6,
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Getting a large read-only context into a worker: pickling it vs. attaching
+a shared memory snapshot and reading a few vars from it.
+
+    python -m benchmarks.shared_snapshot
+"""
+import pickle
+import time
+
+from runtime_context import RuntimeContextWrapper
+from runtime_context.shared import attach_snapshot, detach_snapshot, export_snapshot
+
+N = 20
+
+
+def bench(func):
+    started = time.perf_counter()
+    for _ in range(N):
+        func()
+    return (time.perf_counter() - started) / N
+
+
+def main():
+    parent = RuntimeContextWrapper()
+    parent.tenants = {'tenant-{}'.format(i): {'name': 'Tenant {}'.format(i), 'plan': i % 3} for i in range(100000)}
+    parent.flags = {'flag-{}'.format(i): bool(i % 2) for i in range(10000)}
+    parent.regions = ['region-{}'.format(i) for i in range(100)]
+    parent.tenant = 'tenant-42'
+
+    context = dict(parent.current)
+    pickled = pickle.dumps(context, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def unpickle_and_read():
+        values = pickle.loads(pickled)
+        return values['tenants'][values['tenant']], values['regions'][0]
+
+    worker = RuntimeContextWrapper()
+
+    def attach_and_read():
+        view = attach_snapshot(worker, snapshot.name)
+        result = worker.tenant, worker.regions[0]
+        detach_snapshot(worker, view)
+        return result
+
+    with export_snapshot(parent) as snapshot:
+        print('context: {:.1f} MB pickled, {:.1f} MB shared memory'.format(len(pickled) / 1e6, snapshot.size / 1e6))
+        print('{:>44}: {:.2f} ms'.format('unpickle whole context, read 2 small vars', bench(unpickle_and_read) * 1e3))
+        print('{:>44}: {:.2f} ms'.format('attach snapshot, read 2 small vars', bench(attach_and_read) * 1e3))
+
+
+if __name__ == '__main__':
+    main()
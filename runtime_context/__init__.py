@@ -1,11 +1,14 @@
 __version__ = '3.0.0'
 
 from .env import EnvBase, runtime_context_env
-from .runtime_context import Context, RuntimeContextWrapper
+from .runtime_context import Context, ContextReader, Lazy, RuntimeContextWrapper, lazy
 
 __all__ = [
     'runtime_context_env',
     'EnvBase',
     'Context',
+    'ContextReader',
     'RuntimeContextWrapper',
+    'Lazy',
+    'lazy',
 ]
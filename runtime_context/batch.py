@@ -0,0 +1,159 @@
+"""
+Running a function in many contexts, see RuntimeContextWrapper.map().
+
+Contexts are given as lists of frames, outermost first, for example
+``[{'region': 'eu'}, {'tenant': 'acme'}]``; a single dictionary is a context of one frame.
+They are ordered into a prefix trie, so contexts that share outer frames are run
+one after another and the shared frames are pushed once for all of them.
+Only the innermost frame is always pushed anew, so that vars set by the function
+don't leak to the next context.
+"""
+import concurrent.futures
+
+from .runtime_context import Context, Lazy
+
+
+class _TrieNode:
+    __slots__ = ('frame', 'children', 'by_key', 'leaves')
+
+    def __init__(self, frame=None):
+        self.frame = frame
+        self.children = []
+        self.by_key = {}
+        self.leaves = []
+
+    def child(self, frame):
+        try:
+            key = frozenset((name, _typed_key(value)) for name, value in frame.items())
+        except TypeError:
+            # Unhashable values, only the same frame object is shared
+            for child in self.children:
+                if child.frame is frame:
+                    return child
+            key = None
+        else:
+            if key in self.by_key:
+                return self.by_key[key]
+
+        child = _TrieNode(frame)
+        self.children.append(child)
+        if key is not None:
+            self.by_key[key] = child
+        return child
+
+
+def _typed_key(value):
+    """
+    Hashable key of ``value`` that includes its type, and the types of items of tuples and frozensets,
+    so that frames with values that are equal but of different types, like 1 and True, are not shared.
+    Raises TypeError for unhashable values.
+    """
+    if type(value) is tuple:
+        return tuple, tuple(_typed_key(item) for item in value)
+    if type(value) is frozenset:
+        return frozenset, frozenset(_typed_key(item) for item in value)
+    hash(value)
+    return type(value), value
+
+
+def _as_path(context):
+    if isinstance(context, dict):
+        return [context]
+    return list(context)
+
+
+def order_contexts(contexts):
+    """
+    Returns a list of (index in ``contexts``, path) in prefix trie order.
+    Equal frames in paths, with values of the same types, are replaced with the same dictionary object
+    (frames with unhashable values only if they are the same object).
+    Contexts that share outer frames keep their relative order.
+    """
+    root = _TrieNode()
+    for index, context in enumerate(contexts):
+        node = root
+        path = []
+        for frame in _as_path(context):
+            node = node.child(frame)
+            path.append(node.frame)
+        node.leaves.append((index, path))
+
+    ordered = []
+    nodes = [root]
+    while nodes:
+        node = nodes.pop()
+        ordered.extend(node.leaves)
+        nodes.extend(reversed(node.children))
+    return ordered
+
+
+def run_paths(wrapper, fn, paths):
+    """
+    Generator that calls ``fn()`` inside each of ``paths`` (a list of (index, path)),
+    pushing and popping only those frames that differ from the previous path,
+    and yields (index, result).
+    """
+    pushed = []  # [(frame, Context)]
+    try:
+        for index, path in paths:
+            common = 0
+            limit = max(0, min(len(pushed), len(path) - 1))
+            # order_contexts() and map_contexts() share frame objects between paths
+            while common < limit and pushed[common][0] is path[common]:
+                common += 1
+            while len(pushed) > common:
+                pushed.pop()[1]._pop_context()
+            for frame in path[common:]:
+                context = Context(wrapper, frame)
+                context._push_context()
+                pushed.append((frame, context))
+            yield index, fn()
+    finally:
+        while pushed:
+            pushed.pop()[1]._pop_context()
+
+
+def run_chunk(wrapper, fn, paths):
+    """
+    Runs a chunk of paths in an executor's worker, on a stack of its own.
+    """
+    with wrapper.isolated():
+        return list(run_paths(wrapper, fn, paths))
+
+
+def map_contexts(wrapper, fn, contexts, executor=None, chunksize=1):
+    """
+    Implementation of RuntimeContextWrapper.map().
+    """
+    contexts = list(contexts)
+    ordered = order_contexts(contexts)
+
+    if executor is None:
+        results = wrapper.bind_iter(run_paths(wrapper, fn, ordered))
+        for index, result in results:
+            yield contexts[index], result
+        return
+
+    # Workers don't see the caller's stack, so contexts the caller is in, including
+    # the base context, are re-entered in the workers as outer frames of every path.
+    # Otherwise worker processes that aren't forked would miss the values set in the base context.
+    # Lazy values are evaluated here, once, like a read would, as they can't be pickled
+    # and would otherwise be evaluated again in each task.
+    prefix = [
+        {name: value.resolve(ctx, name) if isinstance(value, Lazy) else value for name, value in list(ctx.items())}
+        for ctx in wrapper._stack[wrapper._base_depth - 1:] if ctx
+    ]
+    if prefix:
+        ordered = [(index, prefix + path) for index, path in ordered]
+
+    futures = [
+        executor.submit(run_chunk, wrapper, fn, ordered[i:i + chunksize])
+        for i in range(0, len(ordered), chunksize)
+    ]
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            for index, result in future.result():
+                yield contexts[index], result
+    finally:
+        for future in futures:
+            future.cancel()
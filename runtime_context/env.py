@@ -2,43 +2,59 @@
 @runtime_context_env is a decorator for your custom Env class which may want to have its attributes overridden by
 context variables.
 """
-from hookery import Event, Registry  # noqa
-
-from .runtime_context import RuntimeContextWrapper
+from .events import Event, Registry  # noqa
+from .runtime_context import ContextReader, Lazy, RuntimeContextWrapper
 
 
 class EnvBase:
     _internals_ = (
         'runtime_context',
         'get',
+        'read',
+        'reader',
+        '_readers',
         'set',
+        'set_lazy',
+        'pool',
+        '_pools',
         'reset',
         'is_context_var',
         'reset_context',
-        '_hookery',
         'context_entered',
         'context_exited',
         'context_var_set',
         'context_var_reset',
         '_handle_runtime_context_entered',
         '_handle_runtime_context_exited',
+        '_changes_only_',
+        '_effective_value',
     )
 
     runtime_context = None  # type: RuntimeContextWrapper
 
-    def __init__(self):
-        self._hookery = Registry()
+    # Readers created by read(), by names
+    _readers = None  # type: dict
+
+    # Pools created by pool(), by name
+    _pools = None  # type: dict
 
+    # If True, context_var_set and context_var_reset only fire when the effective value of a context var
+    # changes, and are passed old_value and new_value. Set with @runtime_context_env(changes_only=True).
+    _changes_only_ = False
+
+    def __init__(self):
         # Event that is fired when a context var has value set inside a context or on context entry.
         # It does not fire on context exit when a context var may have its value effectively reset.
         # If in your context_var_set listener you write any side changes to the current context,
         # it should be sufficient to listen to only this event as all such side changes
         # will be reset on exiting the context anyway -- then there is no need to listen to context_var_reset.
-        self.context_var_set = self._hookery.register_event('context_var_set')  # type: Event
+        # The event is also passed `lazy` which is True if the value is a Lazy which hasn't been evaluated --
+        # listeners that don't want to force the evaluation can check it instead of reading the value.
+        self.context_var_set = Event('context_var_set')  # type: Event
 
         # Event fired when a context var has value reset on context exit
         # or when context var has value reset individually
-        self.context_var_reset = self._hookery.register_event('context_var_reset')  # type: Event
+        self.context_var_reset = Event('context_var_reset')  # type: Event
 
         # Event fired on entering a context
         self.context_entered = self.runtime_context.context_entered  # type: Event
@@ -77,8 +93,16 @@ class EnvBase:
         if name in EnvBase._internals_:
             object.__setattr__(self, name, value)
         elif self.is_context_var(name):
-            self.runtime_context.set(name, value)
-            self.context_var_set(name=name)
+            if self._changes_only_:
+                old_value = self._effective_value(name)
+                self.runtime_context.set(name, value)
+                if _is_change(old_value, value):
+                    self.context_var_set(
+                        name=name, lazy=isinstance(value, Lazy), old_value=old_value, new_value=value,
+                    )
+            else:
+                self.runtime_context.set(name, value)
+                self.context_var_set(name=name, lazy=isinstance(value, Lazy))
         else:
             object.__setattr__(self, name, value)
 
@@ -86,8 +110,15 @@ class EnvBase:
         if name in EnvBase._internals_:
             raise AttributeError('{!r} should not be deleted'.format(name))
         elif self.is_context_var(name):
-            self.runtime_context.reset(name)
-            self.context_var_reset(name=name)
+            if self._changes_only_:
+                old_value = self._effective_value(name)
+                self.runtime_context.reset(name)
+                new_value = self._effective_value(name)
+                if _is_change(old_value, new_value):
+                    self.context_var_reset(name=name, old_value=old_value, new_value=new_value)
+            else:
+                self.runtime_context.reset(name)
+                self.context_var_reset(name=name)
         else:
             object.__delattr__(self, name)
 
@@ -96,27 +127,128 @@ class EnvBase:
             raise AttributeError(name)
         return getattr(self, name)
 
+    def read(self, *names) -> tuple:
+        """
+        Returns a tuple of values of context vars ``names``, looked up in one pass over the stack.
+        """
+        reader = self._readers.get(names)
+        if reader is None:
+            reader = self._readers[names] = self.reader(*names)
+        return reader()
+
+    def reader(self, *names, named=False) -> ContextReader:
+        """
+        Returns a callable that does what read() does, for a fixed list of names.
+        Create it once and call it in hot code.
+        """
+        for name in names:
+            if not self.is_context_var(name):
+                raise AttributeError(name)
+        env_cls = type(self)
+        defaults = tuple(getattr(env_cls, name) for name in names)
+        return self.runtime_context.reader(names, defaults, named=named)
+
     def set(self, name, value):
         if not self.is_context_var(name):
             raise AttributeError(name)
         setattr(self, name, value)
 
+    def set_lazy(self, name, factory):
+        """
+        Sets the value of a context var to be computed by ``factory`` on first read.
+        """
+        self.set(name, Lazy(factory))
+
+    def pool(self, name, key=None, factory=None, maxsize=None, idle_timeout=None, close=None):
+        """
+        Returns the resource pool registered under ``name``, creating it on first call.
+        See runtime_context.pool.ResourcePool for the arguments.
+        """
+        if name not in self._pools:
+            if key is None or factory is None:
+                raise ValueError('Pool {!r} does not exist, key and factory are required to create it'.format(name))
+            from .pool import ResourcePool
+            for k in key:
+                if not self.is_context_var(k):
+                    raise AttributeError(k)
+            self._pools[name] = ResourcePool(
+                self, key, factory, maxsize=maxsize, idle_timeout=idle_timeout, close=close, name=name,
+            )
+        return self._pools[name]
+
     def reset(self, name):
         delattr(self, name)
 
     def reset_context(self):
         return self.runtime_context.reset_context()
 
+    def _effective_value(self, name, skip=None):
+        """
+        Returns the value of context var ``name`` as it is stored in the stack, without evaluating Lazy values,
+        or the class default (None for names the class doesn't declare). Context ``skip`` is left out of the lookup.
+        """
+        for ctx in reversed(self.runtime_context._stack):
+            if ctx is not skip and name in ctx:
+                return ctx[name]
+        return getattr(type(self), name, None)
+
     def _handle_runtime_context_entered(self, context_vars):
-        for k in list(context_vars.keys()):
-            self.context_var_set(name=k)
+        if self._changes_only_:
+            # The context is already pushed, old values are those it shadows
+            for k, v in list(context_vars.items()):
+                old_value = self._effective_value(k, skip=context_vars)
+                if _is_change(old_value, v):
+                    self.context_var_set(name=k, lazy=isinstance(v, Lazy), old_value=old_value, new_value=v)
+            return
+        for k, v in list(context_vars.items()):
+            self.context_var_set(name=k, lazy=isinstance(v, Lazy))
 
     def _handle_runtime_context_exited(self, context_vars):
+        if self._changes_only_:
+            for k, v in list(context_vars.items()):
+                new_value = self._effective_value(k)
+                if _is_change(v, new_value):
+                    self.context_var_reset(name=k, old_value=v, new_value=new_value)
+            return
         for k in list(context_vars.keys()):
             self.context_var_reset(name=k)
 
 
-def runtime_context_env(env_cls):
+def _is_change(old_value, new_value):
+    """
+    Compares by identity first, then by equality. Lazy values that haven't been evaluated
+    are not evaluated for the comparison, they are a change unless it is the same Lazy.
+    """
+    if old_value is new_value:
+        return False
+    if isinstance(old_value, Lazy) or isinstance(new_value, Lazy):
+        return True
+    try:
+        return not (old_value == new_value)
+    except Exception:
+        # For example, numpy arrays which can't be compared as a whole
+        return True
+
+
+def _get_wrapper(runtime_context) -> RuntimeContextWrapper:
+    """
+    Integrations accept either a RuntimeContextWrapper or an env, this returns the wrapper.
+    """
+    if isinstance(runtime_context, EnvBase):
+        return runtime_context.runtime_context
+    return runtime_context
+
+
+def runtime_context_env(env_cls=None, changes_only=False):
+    """
+    Use as ``@runtime_context_env`` or, to only be notified of changed values,
+    as ``@runtime_context_env(changes_only=True)``.
+    """
+    if env_cls is None:
+        return lambda cls: runtime_context_env(cls, changes_only=changes_only)
     return type(env_cls.__name__, (env_cls, EnvBase), {
         'runtime_context': RuntimeContextWrapper(),
+        '_readers': {},
+        '_pools': {},
+        '_changes_only_': changes_only,
     })
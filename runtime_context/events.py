@@ -0,0 +1,190 @@
+"""
+Minimal events for the few fixed events of RuntimeContextWrapper and EnvBase.
+
+The listener API is the same as hookery's:
+
+    @env.context_var_set.listener
+    def on_set(name):
+        ...
+
+    @env.context_var_set.listener(predicate=lambda name: name == 'config_file')
+    def on_config_file_set():
+        ...
+
+Listeners and predicates are only passed those keyword arguments of the event that
+they declare (all of them if they accept ``**kwargs``). Signatures are inspected once,
+when a listener is registered, and the event keeps its listeners in a tuple that
+is iterated directly when the event fires.
+
+To unregister a listener, pass it or its function to ``event.remove()``. Changes
+made directly to ``event.listeners`` take effect too.
+"""
+import collections
+
+# inspect.CO_VARKEYWORDS, without importing inspect which is slow to import
+_CO_VARKEYWORDS = 0x08
+
+
+def _get_params(func):
+    """
+    Returns names of keyword arguments that ``func`` accepts, or None if it accepts any.
+    """
+    code = getattr(func, '__code__', None)
+    skip = 0
+    if code is None and hasattr(func, '__func__') and hasattr(func.__func__, '__code__'):
+        # Bound method, its first argument is already bound
+        code = func.__func__.__code__
+        skip = 1
+
+    if code is None:
+        return _get_params_from_signature(func)
+
+    if code.co_flags & _CO_VARKEYWORDS:
+        return None
+    start = max(skip, getattr(code, 'co_posonlyargcount', 0))
+    return frozenset(code.co_varnames[start:code.co_argcount + code.co_kwonlyargcount])
+
+
+def _get_params_from_signature(func):
+    """
+    Slow path of _get_params() for callables other than functions and methods.
+    """
+    import inspect
+
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_KEYWORD for p in parameters):
+        return None
+    return frozenset(p.name for p in parameters if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+
+
+class EventListener:
+    """
+    Returned by Event.listener(). When created without ``func``, it is a decorator
+    that registers the function it is applied to.
+    """
+
+    def __init__(self, event: 'Event', func=None, predicate=None):
+        self.event = event
+        self.func = None
+        self.predicate = predicate
+        self.__name__ = None
+        self._func_params = None
+        self._predicate_params = None
+        if func is not None:
+            self._register(func)
+
+    def _register(self, func):
+        self.func = func
+        self.__name__ = getattr(func, '__name__', str(func))
+        self._func_params = _get_params(func)
+        self._predicate_params = _get_params(self.predicate) if self.predicate else None
+        self.event.listeners.append(self)
+
+    def __call__(self, func=None, **kwargs):
+        if self.func is None:
+            # The listener is used as a decorator that was passed extra arguments
+            assert callable(func)
+            assert not kwargs
+            self._register(func)
+            return self
+        return self.func(**kwargs)
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(self.__class__.__name__, self.__name__)
+
+
+def _rebuilding(name):
+    method = getattr(list, name)
+
+    def rebuilding_method(self, *args):
+        result = method(self, *args)
+        self._event._rebuild()
+        return result
+
+    rebuilding_method.__name__ = name
+    return rebuilding_method
+
+
+class _ListenerList(list):
+    """
+    Event.listeners. Every change to the list rebuilds the tuple the event dispatches from.
+    """
+
+    def __init__(self, event: 'Event'):
+        super().__init__()
+        self._event = event
+
+    append = _rebuilding('append')
+    extend = _rebuilding('extend')
+    insert = _rebuilding('insert')
+    remove = _rebuilding('remove')
+    pop = _rebuilding('pop')
+    clear = _rebuilding('clear')
+    sort = _rebuilding('sort')
+    reverse = _rebuilding('reverse')
+    __setitem__ = _rebuilding('__setitem__')
+    __delitem__ = _rebuilding('__delitem__')
+    __iadd__ = _rebuilding('__iadd__')
+    __imul__ = _rebuilding('__imul__')
+
+
+class Event:
+    def __init__(self, name):
+        self.name = name
+        self.listeners = _ListenerList(self)
+
+        # (func, func params, predicate, predicate params) of each listener
+        self._calls = ()
+
+    def listener(self, func=None, predicate=None) -> EventListener:
+        return EventListener(self, func=func, predicate=predicate)
+
+    def remove(self, listener):
+        """
+        Unregisters a listener, given either what listener() returned or the listener function.
+        """
+        for registered in self.listeners:
+            if registered is listener or registered.func is listener:
+                self.listeners.remove(registered)
+                return
+        raise ValueError('{!r} is not a listener of {!r}'.format(listener, self))
+
+    def _rebuild(self):
+        self._calls = tuple(
+            (listener.func, listener._func_params, listener.predicate, listener._predicate_params)
+            for listener in self.listeners
+        )
+
+    def __call__(self, **kwargs):
+        for func, func_params, predicate, predicate_params in self._calls:
+            if predicate is not None:
+                if predicate_params is None:
+                    if not predicate(**kwargs):
+                        continue
+                elif not predicate(**{k: v for k, v in kwargs.items() if k in predicate_params}):
+                    continue
+            if func_params is None:
+                func(**kwargs)
+            else:
+                func(**{k: v for k, v in kwargs.items() if k in func_params})
+
+    trigger = __call__
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(self.__class__.__name__, self.name)
+
+
+class Registry:
+    """
+    Minimal stand-in for hookery.Registry, for code that imported it from runtime_context.env.
+    """
+
+    def __init__(self):
+        self.events = collections.OrderedDict()
+
+    def register_event(self, name) -> Event:
+        event = self.events[name] = Event(name)
+        return event
@@ -0,0 +1,77 @@
+"""
+Support for preforking servers.
+
+Call in the parent process, before workers are forked::
+
+    from runtime_context.fork import enable_fork_reset, freeze_defaults
+
+    enable_fork_reset()
+    freeze_defaults()
+
+``enable_fork_reset()`` makes forked children start with clean stacks: contexts that were
+open in the parent at fork time are dropped, the base context of each wrapper,
+which holds the process-wide defaults, is kept.
+
+``freeze_defaults()`` moves all objects that exist at that point, including env defaults
+and anything else loaded at startup, out of the garbage collector's reach
+(see gc.freeze()). Without it, the first collection in each child writes to the
+GC headers of these objects and so copies the memory pages they are in.
+"""
+import gc
+import os
+
+from .runtime_context import _base_stacks, _versions
+
+_registered = False
+_enabled = False
+
+
+def reset_stacks():
+    """
+    Drops all contexts except the base context (and read-only layers under it) from the stacks of all wrappers,
+    and makes the current thread use the base stacks again.
+
+    Called in forked children when enable_fork_reset() is on. Contexts that are dropped
+    are not popped, no events are fired for them, and code that was inside them
+    at fork time must not try to exit them in the child.
+    """
+    for wrapper, stack in list(_base_stacks.items()):
+        del stack[wrapper._base_depth:]
+        wrapper._stack_var.set(stack)
+        wrapper._version = next(_versions)
+
+
+def _after_fork_in_child():
+    if _enabled:
+        reset_stacks()
+
+
+def enable_fork_reset():
+    """
+    Makes forked child processes call reset_stacks(). Requires Python 3.7+ on a platform with os.fork().
+    """
+    global _registered, _enabled
+    if not hasattr(os, 'register_at_fork'):
+        raise RuntimeError('os.register_at_fork() is not available on this platform')
+    if not _registered:
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        _registered = True
+    _enabled = True
+
+
+def disable_fork_reset():
+    global _enabled
+    _enabled = False
+
+
+def freeze_defaults():
+    """
+    Collects garbage and then freezes all remaining objects with gc.freeze(),
+    so that garbage collection in forked children doesn't touch them. Call this
+    in the parent once env defaults and other read-only startup data are loaded,
+    just before forking. Requires Python 3.7+.
+    """
+    if not hasattr(gc, 'freeze'):
+        raise RuntimeError('gc.freeze() is not available in this Python version')
+    gc.collect()
+    gc.freeze()
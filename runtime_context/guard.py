@@ -0,0 +1,134 @@
+"""
+Guard against unbalanced push_context() / pop_context() calls.
+
+    guard = StackGuard(max_depth=50, debug=True)
+    guard.attach(env)
+
+A missed pop_context() makes the stack grow forever and every read slower.
+With a guard attached:
+
+* pushing beyond ``max_depth`` raises RuntimeError,
+* popping a context that isn't current, or the base context, raises RuntimeError
+  (instead of failing an assert, which doesn't run under ``python -O``),
+* ``guard.max_depth_seen`` records the deepest stack seen, and ``wrapper.depth``
+  is the current depth -- both can be exported as gauges,
+* in debug mode every pushed context remembers when and where it was pushed
+  (a full stack trace is captured for every ``sample_every``-th push only),
+  and ``guard.leak_report(older_than=...)`` lists contexts that are still on a stack.
+"""
+import collections
+import os
+import sys
+import time
+import traceback
+import weakref
+
+from .env import _get_wrapper
+
+_package_dir = os.path.dirname(os.path.abspath(__file__))
+
+PushInfo = collections.namedtuple('PushInfo', 'pushed_at depth pushed_from stack')
+
+LeakedContext = collections.namedtuple('LeakedContext', 'age depth names pushed_from stack')
+
+
+def _get_caller():
+    """
+    Returns 'file:line in function' of the nearest caller outside this package.
+    """
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename.startswith(_package_dir):
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return '{}:{} in {}'.format(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+
+
+def _describe(context):
+    push_info = getattr(context, '_push_info', None)
+    if push_info is None:
+        return 'context with vars {}'.format(sorted(context))
+    return 'context with vars {} pushed at {}'.format(sorted(context), push_info.pushed_from)
+
+
+class StackGuard:
+    """
+    ``max_depth`` -- maximum number of contexts in the stack, including the base context, or None.
+
+    ``debug`` -- record when and where each context is pushed.
+
+    ``sample_every`` -- in debug mode, capture a full stack trace of every n-th push.
+    """
+
+    def __init__(self, max_depth=None, debug=False, sample_every=100, stack_limit=20):
+        self.max_depth = max_depth
+        self.debug = debug
+        self.sample_every = sample_every
+        self.stack_limit = stack_limit
+        self.max_depth_seen = 0
+        self._pushes = 0
+        self._live = weakref.WeakValueDictionary()
+
+    def attach(self, runtime_context):
+        """
+        Starts guarding a RuntimeContextWrapper or an env.
+        """
+        _get_wrapper(runtime_context)._guard = self
+
+    def detach(self, runtime_context):
+        wrapper = _get_wrapper(runtime_context)
+        if wrapper._guard is self:
+            wrapper._guard = None
+
+    def check_push(self, wrapper, context):
+        depth = len(wrapper._stack) + 1
+        if self.max_depth is not None and depth > self.max_depth:
+            raise RuntimeError(
+                'Pushing a context would exceed max_depth={} of {!r}, '
+                'probably pop_context() is missing for {}'.format(self.max_depth, wrapper, _describe(wrapper.current))
+            )
+        if depth > self.max_depth_seen:
+            self.max_depth_seen = depth
+
+        if self.debug:
+            sampled = self._pushes % self.sample_every == 0
+            self._pushes += 1
+            context._push_info = PushInfo(
+                pushed_at=time.monotonic(),
+                depth=depth,
+                pushed_from=_get_caller(),
+                stack=traceback.format_stack(limit=self.stack_limit) if sampled else None,
+            )
+            self._live[id(context)] = context
+
+    def check_pop(self, wrapper, context):
+        stack = wrapper._stack
+        if len(stack) <= wrapper._base_depth:
+            raise RuntimeError('Trying to pop the base context of {!r}, pops and pushes are unbalanced'.format(wrapper))
+        if stack[-1] is not context:
+            raise RuntimeError('Trying to pop {} while the current context is {}'.format(
+                _describe(context), _describe(stack[-1]),
+            ))
+        if self.debug:
+            self._live.pop(id(context), None)
+
+    def leak_report(self, older_than=60.0):
+        """
+        Returns contexts pushed in debug mode more than ``older_than`` seconds ago
+        which are still on a stack, oldest first.
+        """
+        now = time.monotonic()
+        report = []
+        for context in list(self._live.values()):
+            push_info = context._push_info
+            age = now - push_info.pushed_at
+            if age >= older_than:
+                report.append(LeakedContext(
+                    age=age,
+                    depth=push_info.depth,
+                    names=sorted(context),
+                    pushed_from=push_info.pushed_from,
+                    stack=push_info.stack,
+                ))
+        report.sort(key=lambda leaked: -leaked.age)
+        return report
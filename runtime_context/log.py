@@ -0,0 +1,98 @@
+"""
+Logging integration: attaches selected context vars to every LogRecord.
+
+    handler.addFilter(ContextFilter(env, ['tenant', 'request_id']))
+
+or, to have the vars on records of all loggers regardless of handler configuration:
+
+    install_record_factory(env, ['tenant', 'request_id'])
+
+The values are looked up once and cached on the current frame, so each request
+or task has its own cache. The cache is only rebuilt after a var is set or reset
+in the current frame, or in a frame that is shared with other stacks.
+"""
+import logging
+
+from .env import EnvBase, _get_wrapper
+
+
+class ContextFilter(logging.Filter):
+    """
+    A logging.Filter that sets context vars as attributes of the records it sees.
+    It never drops records.
+
+    ``names`` is either a list of context var names or a dictionary mapping
+    context var names to record attribute names.
+
+    Vars not present in the context get ``default``, or, if ``runtime_context``
+    is an env, the default declared on the env class.
+
+    If ``string_attr`` is set, the record also gets an attribute with that name
+    holding all values preformatted as ``name=value`` pairs, ready to be used
+    in a format string like ``'%(message)s [%(context)s]'``.
+    """
+
+    def __init__(self, runtime_context, names, default=None, string_attr=None):
+        super().__init__()
+        self.runtime_context = _get_wrapper(runtime_context)
+        if not isinstance(names, dict):
+            names = {name: name for name in names}
+        self._names = tuple(names.items())
+
+        if isinstance(runtime_context, EnvBase):
+            env_cls = type(runtime_context)
+            defaults = tuple(getattr(env_cls, name, default) for name, _ in self._names)
+        else:
+            defaults = tuple(default for _ in self._names)
+        self._reader = self.runtime_context.reader([name for name, _ in self._names], defaults)
+        self._attrs = tuple(attr for _, attr in self._names)
+
+        self.string_attr = string_attr
+
+    def values(self) -> dict:
+        """
+        Returns the record attributes for the current context.
+        Do not modify the returned dictionary, it is shared between records.
+        """
+        wrapper = self.runtime_context
+        frame = wrapper._stack[-1]
+        version = (frame._version, wrapper._shared_version)
+
+        # frame._log_values is {filter: (stack version, record attributes)}
+        cache = frame.__dict__.get('_log_values')
+        if cache is None:
+            cache = frame._log_values = {}
+        cached = cache.get(self)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        values = dict(zip(self._attrs, self._reader()))
+
+        if self.string_attr:
+            values[self.string_attr] = ' '.join('{}={}'.format(attr, values[attr]) for attr in self._attrs)
+
+        cache[self] = (version, values)
+        return values
+
+    def filter(self, record):
+        record.__dict__.update(self.values())
+        return True
+
+
+def install_record_factory(runtime_context, names, default=None, string_attr=None) -> ContextFilter:
+    """
+    Wraps the current LogRecord factory so that every record created gets the context vars
+    as attributes. Arguments are the same as for ContextFilter.
+
+    Returns the ContextFilter that is used, so that the caller can inspect it.
+    """
+    context_filter = ContextFilter(runtime_context, names, default=default, string_attr=string_attr)
+    original_factory = logging.getLogRecordFactory()
+
+    def record_factory(*args, **kwargs):
+        record = original_factory(*args, **kwargs)
+        record.__dict__.update(context_filter.values())
+        return record
+
+    logging.setLogRecordFactory(record_factory)
+    return context_filter
@@ -0,0 +1,179 @@
+"""
+WSGI and ASGI middleware that run each request inside its own runtime context.
+
+Request headers (and, optionally, raw WSGI environ or ASGI scope keys) are mapped to
+context vars. The mapping is compiled once, when the middleware is created::
+
+    app = WSGIMiddleware(app, env, headers={'X-Tenant': 'tenant', 'X-Request-Id': 'request_id'})
+
+Each request gets its own copy of the stack (see RuntimeContextWrapper.isolated()), so
+concurrent requests in threads or asyncio tasks don't see each other's context vars.
+"""
+from . import runtime_context as _runtime_context
+from .env import _get_wrapper
+from .runtime_context import Context
+
+# WSGI puts these two headers in environ without the HTTP_ prefix.
+_WSGI_UNPREFIXED_HEADERS = ('CONTENT_TYPE', 'CONTENT_LENGTH')
+
+
+def _compile_wsgi_headers(headers):
+    """
+    Turns {'X-Tenant': 'tenant'} into (('HTTP_X_TENANT', 'tenant'),).
+    """
+    compiled = []
+    for header, name in headers.items():
+        key = header.upper().replace('-', '_')
+        if key not in _WSGI_UNPREFIXED_HEADERS:
+            key = 'HTTP_' + key
+        compiled.append((key, name))
+    return tuple(compiled)
+
+
+def _compile_asgi_headers(headers):
+    """
+    Turns {'X-Tenant': 'tenant'} into {b'x-tenant': 'tenant'}.
+    ASGI servers pass header names lower-cased and as bytes.
+    """
+    return {header.lower().encode('latin-1'): name for header, name in headers.items()}
+
+
+class _ResponseBody:
+    """
+    Response iterable returned by WSGIMiddleware when the application's response isn't a list or a tuple.
+    The body is produced inside the request's context, which is exited when the server calls close().
+    """
+
+    def __init__(self, wrapper, stack, context: Context, response):
+        self.wrapper = wrapper
+        self._stack = stack
+        self._context = context
+        self._response = response
+        self._iterator = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        stack_var = self.wrapper._stack_var
+        token = stack_var.set(self._stack)
+        try:
+            if self._iterator is None:
+                self._iterator = iter(self._response)
+            return next(self._iterator)
+        finally:
+            stack_var.reset(token)
+
+    def close(self):
+        if self._context is None:
+            return
+        stack_var = self.wrapper._stack_var
+        token = stack_var.set(self._stack)
+        try:
+            close = getattr(self._response, 'close', None)
+            try:
+                if close is not None:
+                    close()
+            finally:
+                context, self._context = self._context, None
+                context._pop_context()
+        finally:
+            stack_var.reset(token)
+
+
+class WSGIMiddleware:
+    """
+    Wraps a WSGI application so that each request is handled inside a new context.
+
+    ``runtime_context`` is either a RuntimeContextWrapper or an env created with
+    @runtime_context_env (in which case its context_var_set listeners fire as usual).
+
+    ``headers`` maps HTTP header names to context var names, ``environ`` maps raw
+    WSGI environ keys to context var names. Headers missing from the request
+    are not set in the context.
+
+    The context is active while the application is called and while the response body
+    is produced. Unless the response is a list or a tuple, the context is exited when
+    the server calls the response's close().
+    """
+
+    def __init__(self, app, runtime_context, headers=None, environ=None):
+        self.app = app
+        self.runtime_context = _get_wrapper(runtime_context)
+        self._environ_keys = _compile_wsgi_headers(headers or {}) + tuple((environ or {}).items())
+
+    def __call__(self, environ, start_response):
+        context_vars = {}
+        for key, name in self._environ_keys:
+            if key in environ:
+                context_vars[name] = environ[key]
+
+        wrapper = self.runtime_context
+        stack = wrapper._copy_stack()
+        token = wrapper._stack_var.set(stack)
+        try:
+            context = Context(wrapper, context_vars)
+            context._push_context()
+            try:
+                response = self.app(environ, start_response)
+            except BaseException:
+                context._pop_context()
+                raise
+            if isinstance(response, (list, tuple)):
+                context._pop_context()
+                return response
+            return _ResponseBody(wrapper, stack, context, response)
+        finally:
+            wrapper._stack_var.reset(token)
+
+
+class ASGIMiddleware:
+    """
+    Wraps an ASGI application so that each HTTP and websocket connection is handled
+    inside a new context. Other scope types (lifespan) are passed through untouched.
+
+    ``runtime_context`` and ``headers`` are the same as for WSGIMiddleware,
+    ``scope`` maps ASGI scope keys to context var names.
+
+    The stack copy is installed in the task's contextvars context, so the context
+    stays with the request across ``await``s. Tasks started by the application
+    inherit the request's stack -- use ``runtime_context.isolated()`` in them
+    if they push contexts of their own.
+
+    Requires Python 3.7+, older Pythons can't isolate stacks per task.
+    """
+
+    def __init__(self, app, runtime_context, headers=None, scope=None):
+        if _runtime_context.ContextVar is None:
+            raise RuntimeError('ASGIMiddleware requires Python 3.7+ (contextvars)')
+        self.app = app
+        self.runtime_context = _get_wrapper(runtime_context)
+        self._headers = _compile_asgi_headers(headers or {})
+        self._scope_keys = tuple((scope or {}).items())
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            await self.app(scope, receive, send)
+            return
+
+        context_vars = {}
+        if self._headers:
+            headers = self._headers
+            for header, value in scope.get('headers', ()):
+                if header in headers:
+                    context_vars[headers[header]] = value.decode('latin-1')
+        for key, name in self._scope_keys:
+            if key in scope:
+                context_vars[name] = scope[key]
+
+        wrapper = self.runtime_context
+        token = wrapper._stack_var.set(wrapper._copy_stack())
+        try:
+            context = Context(wrapper, context_vars)
+            context._push_context()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                context._pop_context()
+        finally:
+            wrapper._stack_var.reset(token)
@@ -0,0 +1,309 @@
+"""
+Pools of resources (connections, clients) keyed by the values of context vars.
+
+    db = env.pool('db', key=('db_name',), factory=connect, maxsize=10, idle_timeout=300)
+
+    with env(db_name='products'):
+        with db.borrow() as conn:
+            ...
+
+``factory`` is called with the values of the key vars, ``connect('products')`` in the example,
+only when there is no idle resource for the current key. Resources acquired with
+``acquire()`` and not released are returned to the pool when the context they were
+acquired in is exited.
+
+Idle resources older than ``idle_timeout`` are evicted when resources are acquired
+or released. A pool that may go without traffic for long should have ``evict_idle()``
+called periodically.
+"""
+import asyncio
+import collections
+import threading
+import time
+
+from .env import EnvBase, _get_wrapper
+
+
+class PoolExhausted(RuntimeError):
+    """
+    Raised when no resource becomes available for a key within the timeout.
+    """
+
+
+# Returned by ResourcePool._take() when the key has no idle resource and is at maxsize
+_UNAVAILABLE = object()
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Borrow:
+    """
+    Context manager returned by ResourcePool.borrow().
+    """
+
+    def __init__(self, pool: 'ResourcePool', timeout):
+        self.pool = pool
+        self.timeout = timeout
+        self.resource = None
+
+    def __enter__(self):
+        self.resource = self.pool.acquire(timeout=self.timeout)
+        return self.resource
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.pool.release(self.resource)
+        self.resource = None
+
+    async def __aenter__(self):
+        self.resource = await self.pool.acquire_async(timeout=self.timeout)
+        return self.resource
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.pool.release(self.resource)
+        self.resource = None
+
+
+class ResourcePool:
+    """
+    ``runtime_context`` -- a RuntimeContextWrapper or an env.
+
+    ``key`` -- names of context vars whose values select the resource.
+
+    ``factory`` -- called with the values of key vars to create a new resource.
+
+    ``maxsize`` -- maximum number of resources (idle and in use) per key, or None.
+
+    ``idle_timeout`` -- seconds after which an idle resource is closed, or None.
+
+    ``close`` -- called with a resource when it is evicted; by default
+    the resource's ``close()`` method is called if it has one.
+
+    Thread-safe. From asyncio code use ``acquire_async()`` or ``async with pool.borrow()``,
+    which don't block the event loop while waiting for a resource.
+    """
+
+    def __init__(self, runtime_context, key, factory, maxsize=None, idle_timeout=None, close=None, name=None):
+        self.runtime_context = _get_wrapper(runtime_context)
+        self.key = tuple(key)
+        if isinstance(runtime_context, EnvBase):
+            self._read_key = runtime_context.reader(*self.key)
+        else:
+            self._read_key = self.runtime_context.reader(self.key)
+        self.factory = factory
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.close = close or _close
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        # key -> deque of (resource, released_at), most recently released on the right
+        self._idle = collections.defaultdict(collections.deque)
+
+        # key -> number of resources idle and in use
+        self._sizes = collections.defaultdict(int)
+
+        # id(resource) -> (key, id of context it was acquired in)
+        self._in_use = {}
+
+        # id(context) -> list of resources acquired in it and not released yet
+        self._by_context = {}
+
+        # (loop, future) of acquire_async() calls waiting for a resource
+        self._async_waiters = []
+
+        # Eviction on acquire and release runs at most once in this many seconds
+        self._evict_every = None if idle_timeout is None else min(idle_timeout, 1.0)
+        self._next_eviction = 0.0
+
+        self.runtime_context.context_exited.listener(self._handle_context_exited)
+
+    def current_key(self) -> tuple:
+        return self._read_key()
+
+    def acquire(self, timeout=None):
+        """
+        Returns a resource for the current key, creating one if there is no idle resource
+        and the key has fewer than ``maxsize`` resources, otherwise waiting for one to be released.
+        Raises PoolExhausted if none is released within ``timeout`` seconds.
+        """
+        self._maybe_evict_idle()
+        key = self.current_key()
+        context = self.runtime_context.current
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                resource = self._take(key)
+                if resource is not _UNAVAILABLE:
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolExhausted('No resource available in {!r} for key {!r}'.format(self, key))
+                self._available.wait(remaining)
+        return self._book(key, context, resource)
+
+    async def acquire_async(self, timeout=None):
+        """
+        Same as acquire(), but waits on the event loop instead of blocking it.
+        """
+        self._maybe_evict_idle()
+        key = self.current_key()
+        context = self.runtime_context.current
+        loop = asyncio.get_event_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._lock:
+                resource = self._take(key)
+                if resource is _UNAVAILABLE:
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+            if resource is not _UNAVAILABLE:
+                return self._book(key, context, resource)
+
+            try:
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    raise PoolExhausted('No resource available in {!r} for key {!r}'.format(self, key))
+                try:
+                    await asyncio.wait_for(waiter, remaining)
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._async_waiters:
+                        self._async_waiters.remove((loop, waiter))
+
+    def borrow(self, timeout=None) -> _Borrow:
+        """
+        Returns a context manager (sync and async) that acquires a resource on entry
+        and releases it on exit.
+        """
+        return _Borrow(self, timeout)
+
+    def release(self, resource):
+        """
+        Returns a resource to the pool. Releasing a resource that isn't in use, for example
+        one that was released when the context it was acquired in was exited, does nothing.
+        """
+        with self._lock:
+            in_use = self._in_use.pop(id(resource), None)
+            if in_use is None:
+                return
+            key, context_id = in_use
+            borrowed = self._by_context[context_id]
+            borrowed.remove(resource)
+            if not borrowed:
+                del self._by_context[context_id]
+            self._idle[key].append((resource, time.monotonic()))
+            self._notify()
+        self._maybe_evict_idle()
+
+    def evict_idle(self):
+        """
+        Closes resources that have been idle for longer than ``idle_timeout``.
+        """
+        if self.idle_timeout is None:
+            return
+        evicted = []
+        now = time.monotonic()
+        deadline = now - self.idle_timeout
+        with self._lock:
+            self._next_eviction = now + self._evict_every
+            for key, idle in list(self._idle.items()):
+                while idle and idle[0][1] <= deadline:
+                    evicted.append(idle.popleft()[0])
+                    self._sizes[key] -= 1
+                if not idle:
+                    del self._idle[key]
+            if evicted:
+                self._notify()
+        for resource in evicted:
+            self.close(resource)
+
+    def clear(self):
+        """
+        Closes all idle resources.
+        """
+        with self._lock:
+            evicted = []
+            for key, idle in self._idle.items():
+                evicted.extend(resource for resource, _ in idle)
+                self._sizes[key] -= len(idle)
+            self._idle.clear()
+            self._notify()
+        for resource in evicted:
+            self.close(resource)
+
+    def stats(self) -> dict:
+        """
+        Returns {key: (idle, in use)}.
+        """
+        with self._lock:
+            return {key: (len(self._idle.get(key, ())), size - len(self._idle.get(key, ())))
+                    for key, size in self._sizes.items() if size}
+
+    def _maybe_evict_idle(self):
+        if self._evict_every is not None and time.monotonic() >= self._next_eviction:
+            self.evict_idle()
+
+    def _take(self, key):
+        """
+        Called with the lock held. Returns an idle resource of ``key``, None if a new one
+        should be created, or _UNAVAILABLE.
+        """
+        idle = self._idle.get(key)
+        if idle:
+            return idle.pop()[0]
+        if self.maxsize is None or self._sizes[key] < self.maxsize:
+            self._sizes[key] += 1
+            return None
+        return _UNAVAILABLE
+
+    def _notify(self):
+        """
+        Called with the lock held. Wakes up everyone waiting for a resource.
+        """
+        self._available.notify_all()
+        for loop, waiter in self._async_waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, waiter)
+        self._async_waiters.clear()
+
+    def _book(self, key, context, resource):
+        """
+        Creates the resource taken by _take() if needed and records it as in use.
+        """
+        if resource is None:
+            try:
+                resource = self.factory(*key)
+            except BaseException:
+                with self._lock:
+                    self._sizes[key] -= 1
+                    self._notify()
+                raise
+
+        with self._lock:
+            self._in_use[id(resource)] = (key, id(context))
+            self._by_context.setdefault(id(context), []).append(resource)
+        return resource
+
+    def _handle_context_exited(self, context_vars):
+        if id(context_vars) not in self._by_context:
+            return
+        with self._lock:
+            borrowed = list(self._by_context.get(id(context_vars), ()))
+        for resource in borrowed:
+            self.release(resource)
+
+    def __repr__(self):
+        return '<{} {!r} key={!r}>'.format(self.__class__.__name__, self.name, self.key)
+
+
+def _close(resource):
+    close = getattr(resource, 'close', None)
+    if close is not None:
+        close()
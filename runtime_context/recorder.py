@@ -0,0 +1,257 @@
+"""
+Recorder of context stack transitions for post-mortem analysis.
+
+    recorder = Recorder(capacity=4096)
+    recorder.attach(env)
+    ...
+    for event in recorder.dump():
+        print(event)
+
+Each thread writes into its own preallocated ring buffer of fixed-size records
+(timestamp, stack id, op, var name id, stack depth), so recording takes no locks
+and creates no per-event containers. Old records are overwritten once a buffer is full.
+Buffers of threads that have finished are kept for post-mortem analysis until
+there are more than ``keep_finished`` of them, then reused by new threads,
+so memory use is bounded in servers that start a thread per request.
+
+Timestamps are from a monotonic clock, in nanoseconds. The snapshot includes
+the offset to add to them to get wall clock time.
+
+The stack id identifies the stack the transition happened in, which distinguishes
+requests and tasks that work with their own copy of the stack (see RuntimeContextWrapper.isolated()).
+"""
+import collections
+import struct
+import threading
+import time
+import weakref
+
+from .env import _get_wrapper
+
+try:
+    _monotonic_ns = time.monotonic_ns
+    _time_ns = time.time_ns
+except AttributeError:  # Python < 3.7
+    def _monotonic_ns():
+        return int(time.monotonic() * 1e9)
+
+    def _time_ns():
+        return int(time.time() * 1e9)
+
+# Ops. A push is recorded as one PUSH followed by a PUSH_VAR for each var in the pushed context.
+PUSH = 1
+PUSH_VAR = 2
+POP = 3
+SET = 4
+RESET = 5
+
+OP_NAMES = {
+    PUSH: 'push',
+    PUSH_VAR: 'push_var',
+    POP: 'pop',
+    SET: 'set',
+    RESET: 'reset',
+}
+
+# Number of int64 slots per record: timestamp, stack id, op, name id, depth
+RECORD_SIZE = 5
+
+_record = struct.Struct('<{}q'.format(RECORD_SIZE))
+
+# Name id recorded for ops that aren't about a single var; a RESET with no name is reset_context().
+NO_NAME = -1
+
+RecordedEvent = collections.namedtuple('RecordedEvent', 'timestamp thread_id thread_name stack_id op name depth')
+
+
+class _RingBuffer:
+    __slots__ = ('thread', 'thread_id', 'thread_name', 'data', 'position')
+
+    def __init__(self, capacity):
+        self.data = bytearray(_record.size * capacity)
+        self.assign()
+
+    def assign(self):
+        """
+        Makes the buffer the current thread's, dropping its records.
+        """
+        thread = threading.current_thread()
+        self.thread = weakref.ref(thread)
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.position = 0
+
+    def is_finished(self):
+        thread = self.thread()
+        return thread is None or not thread.is_alive()
+
+    def last_timestamp(self, capacity):
+        if not self.position:
+            return 0
+        return _record.unpack_from(self.data, ((self.position - 1) % capacity) * _record.size)[0]
+
+
+class Recorder:
+    """
+    Records pushes, pops, sets and resets of the wrappers it is attached to.
+
+    ``capacity`` is the number of records kept per thread.
+
+    ``keep_finished`` is the number of buffers of finished threads that are kept
+    before they are reused by new threads.
+    """
+
+    def __init__(self, capacity=4096, keep_finished=8):
+        self.capacity = capacity
+        self.keep_finished = keep_finished
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._buffers = []
+        self._names = []
+        self._name_ids = {}
+
+    def attach(self, runtime_context):
+        """
+        Starts recording transitions of a RuntimeContextWrapper or an env.
+        """
+        _get_wrapper(runtime_context)._recorder = self
+
+    def detach(self, runtime_context):
+        wrapper = _get_wrapper(runtime_context)
+        if wrapper._recorder is self:
+            wrapper._recorder = None
+
+    def _new_buffer(self) -> _RingBuffer:
+        """
+        Called on the first record of a thread. Reuses the buffer of the thread that finished first,
+        if there are more than ``keep_finished`` buffers of finished threads.
+        """
+        with self._lock:
+            finished = [buffer for buffer in self._buffers if buffer.is_finished()]
+            if len(finished) > self.keep_finished:
+                buffer = min(finished, key=lambda b: b.last_timestamp(self.capacity))
+                buffer.assign()
+            else:
+                buffer = _RingBuffer(self.capacity)
+                self._buffers.append(buffer)
+        self._local.buffer = buffer
+        return buffer
+
+    def _add_name(self, name):
+        with self._lock:
+            name_id = self._name_ids.get(name)
+            if name_id is None:
+                name_id = self._name_ids[name] = len(self._names)
+                self._names.append(name)
+        return name_id
+
+    def record_push(self, stack, context):
+        buffer = getattr(self._local, 'buffer', None) or self._new_buffer()
+        data = buffer.data
+        position = buffer.position
+        capacity = self.capacity
+        timestamp = _monotonic_ns()
+        stack_id = id(stack)
+        depth = len(stack)
+        pack_into = _record.pack_into
+        size = _record.size
+
+        pack_into(data, (position % capacity) * size, timestamp, stack_id, PUSH, NO_NAME, depth)
+        position += 1
+        name_ids = self._name_ids
+        for name in context:
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = self._add_name(name)
+            pack_into(data, (position % capacity) * size, timestamp, stack_id, PUSH_VAR, name_id, depth)
+            position += 1
+        buffer.position = position
+
+    def record_pop(self, stack):
+        buffer = getattr(self._local, 'buffer', None) or self._new_buffer()
+        position = buffer.position
+        _record.pack_into(
+            buffer.data, (position % self.capacity) * _record.size,
+            _monotonic_ns(), id(stack), POP, NO_NAME, len(stack),
+        )
+        buffer.position = position + 1
+
+    def record_set(self, stack, name):
+        self._record_var(SET, stack, name)
+
+    def record_reset(self, stack, name):
+        self._record_var(RESET, stack, name)
+
+    def _record_var(self, op, stack, name):
+        buffer = getattr(self._local, 'buffer', None) or self._new_buffer()
+        if name is None:
+            name_id = NO_NAME
+        else:
+            name_id = self._name_ids.get(name)
+            if name_id is None:
+                name_id = self._add_name(name)
+        position = buffer.position
+        _record.pack_into(
+            buffer.data, (position % self.capacity) * _record.size,
+            _monotonic_ns(), id(stack), op, name_id, len(stack),
+        )
+        buffer.position = position + 1
+
+    def snapshot(self) -> dict:
+        """
+        Returns the raw content of all buffers as a picklable / JSON-serialisable dictionary
+        that can be stored and decoded later with decode().
+        """
+        with self._lock:
+            buffers = list(self._buffers)
+            names = list(self._names)
+        return {
+            'capacity': self.capacity,
+            'names': names,
+            'wall_clock_offset': _time_ns() - _monotonic_ns(),
+            'buffers': [
+                {
+                    'thread_id': buffer.thread_id,
+                    'thread_name': buffer.thread_name,
+                    'position': buffer.position,
+                    'data': bytes(buffer.data),
+                }
+                for buffer in buffers
+            ],
+        }
+
+    def dump(self):
+        """
+        Returns the recorded events of all threads, oldest first.
+        """
+        return decode(self.snapshot())
+
+    def clear(self):
+        with self._lock:
+            for buffer in self._buffers:
+                buffer.position = 0
+
+
+def decode(snapshot: dict):
+    """
+    Turns the output of Recorder.snapshot() into a list of RecordedEvent, oldest first.
+    """
+    capacity = snapshot['capacity']
+    names = snapshot['names']
+    events = []
+    for buffer in snapshot['buffers']:
+        data = buffer['data']
+        position = buffer['position']
+        for p in range(max(0, position - capacity), position):
+            timestamp, stack_id, op, name_id, depth = _record.unpack_from(data, (p % capacity) * _record.size)
+            events.append(RecordedEvent(
+                timestamp=timestamp,
+                thread_id=buffer['thread_id'],
+                thread_name=buffer['thread_name'],
+                stack_id=stack_id,
+                op=OP_NAMES[op],
+                name=None if name_id == NO_NAME else names[name_id],
+                depth=depth,
+            ))
+    events.sort(key=lambda event: event.timestamp)
+    return events
@@ -1,11 +1,195 @@
 import collections
+import functools
+import importlib
+import itertools
+import sys
 import threading
 
-from hookery import Registry
+from .events import Event
+
+try:
+    from contextvars import ContextVar
+except ImportError:  # Python < 3.7
+    ContextVar = None
 
 _thread_local = threading.local()
 _thread_local.stack = collections.defaultdict(list)
 
+# Base stacks of all wrappers, by wrapper. This is _thread_local.stack, which only
+# exists in the thread that imported this module, under a name that works in any thread.
+_base_stacks = _thread_local.stack
+
+# Source of RuntimeContextWrapper._version values, unique across all wrappers.
+_versions = itertools.count()
+
+
+class _ThreadVar:
+    """
+    Stand-in for contextvars.ContextVar on Pythons that don't have it.
+    Holds a value per thread, so stacks are isolated per thread but not per asyncio task there.
+    """
+
+    def __init__(self, name, default=None):
+        self.name = name
+        self._default = default
+        self._local = threading.local()
+
+    def get(self):
+        return getattr(self._local, 'value', self._default)
+
+    def set(self, value):
+        token = self.get()
+        self._local.value = value
+        return token
+
+    def reset(self, token):
+        self._local.value = token
+
+
+def _require_contextvars(feature):
+    if ContextVar is None:
+        raise RuntimeError('{} requires Python 3.7+ (contextvars)'.format(feature))
+
+
+class _IsolatedStack:
+    """
+    Context manager returned by RuntimeContextWrapper.isolated().
+    """
+
+    def __init__(self, wrapper: 'RuntimeContextWrapper'):
+        self.wrapper = wrapper
+        self._token = None
+
+    def __enter__(self):
+        self._token = self.wrapper._stack_var.set(self.wrapper._copy_stack())
+        return self.wrapper
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.wrapper._stack_var.reset(self._token)
+        self._token = None
+
+
+class _BoundIterator:
+    """
+    Iterator returned by RuntimeContextWrapper.bind_iter().
+    """
+
+    def __init__(self, wrapper: 'RuntimeContextWrapper', iterable):
+        self.wrapper = wrapper
+        self._iterator = iter(iterable)
+        self._stack = wrapper._copy_stack()
+
+    def _step(self, func, *args):
+        stack_var = self.wrapper._stack_var
+        token = stack_var.set(self._stack)
+        try:
+            return func(*args)
+        finally:
+            stack_var.reset(token)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self._step(next, self._iterator)
+
+    def send(self, value):
+        return self._step(self._iterator.send, value)
+
+    def throw(self, *args):
+        return self._step(self._iterator.throw, *args)
+
+    def close(self):
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            self._step(close)
+
+    def __del__(self):
+        # A generator that is garbage collected unfinished runs its finally blocks,
+        # which may pop contexts, so close it while its own stack is in place.
+        if '_iterator' in self.__dict__:
+            self.close()
+
+
+class _BoundAsyncIterator:
+    """
+    Asynchronous iterator returned by RuntimeContextWrapper.bind_aiter().
+    """
+
+    def __init__(self, wrapper: 'RuntimeContextWrapper', async_iterable):
+        self.wrapper = wrapper
+        self._iterator = async_iterable.__aiter__()
+        self._stack = wrapper._copy_stack()
+
+    async def _step(self, func, *args):
+        stack_var = self.wrapper._stack_var
+        token = stack_var.set(self._stack)
+        try:
+            return await func(*args)
+        finally:
+            stack_var.reset(token)
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return self._step(self._iterator.__anext__)
+
+    def asend(self, value):
+        return self._step(self._iterator.asend, value)
+
+    def athrow(self, *args):
+        return self._step(self._iterator.athrow, *args)
+
+    async def aclose(self):
+        aclose = getattr(self._iterator, 'aclose', None)
+        if aclose is not None:
+            await self._step(aclose)
+
+
+class Lazy:
+    """
+    Value of a context var that is computed by calling ``factory`` on first read.
+
+    The result replaces the Lazy in the context it was set in, so the factory
+    is called at most once per context, and the result goes away when the context is popped.
+    """
+
+    __slots__ = ('factory', '_lock', '_resolving')
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._lock = threading.RLock()
+        self._resolving = False
+
+    def resolve(self, context: dict, name):
+        with self._lock:
+            value = dict.get(context, name, self)
+            if value is self:
+                # Other threads wait for the lock, so this is the factory reading the var it computes
+                if self._resolving:
+                    raise RuntimeError('Factory of lazy context var {!r} reads {!r} itself'.format(name, name))
+                self._resolving = True
+                try:
+                    value = self.factory()
+                finally:
+                    self._resolving = False
+                context[name] = value
+            return value
+
+    def __repr__(self):
+        return '<{} {!r}>'.format(self.__class__.__name__, self.factory)
+
+
+def lazy(factory) -> Lazy:
+    """
+    Marks a context var value as lazy:
+
+        with runtime_context(user=lazy(load_user)):
+            ...
+    """
+    return Lazy(factory)
+
 
 class Context(dict):
     """
@@ -17,6 +201,12 @@ class Context(dict):
     to pop itself from the stack.
     """
 
+    # Changes when the context is pushed or a var is set or reset in it.
+    _version = 0
+
+    # True once the context is in more than one stack, see RuntimeContextWrapper._copy_stack().
+    _shared = False
+
     def __init__(self, wrapper: 'RuntimeContextWrapper', context_vars: dict):
         super().__init__(context_vars)
         self.wrapper = wrapper
@@ -29,13 +219,77 @@ class Context(dict):
         self._pop_context()
 
     def _push_context(self):
-        self.wrapper._stack.append(self)
-        self.wrapper.context_entered(context_vars=self)
+        wrapper = self.wrapper
+        if wrapper._guard is not None:
+            wrapper._guard.check_push(wrapper, self)
+        stack = wrapper._stack
+        stack.append(self)
+        self._version = wrapper._version = next(_versions)
+        if wrapper._recorder is not None:
+            wrapper._recorder.record_push(stack, self)
+        wrapper.context_entered(context_vars=self)
 
     def _pop_context(self):
-        assert self.wrapper.current is self
-        self.wrapper._stack.pop()
-        self.wrapper.context_exited(context_vars=self)
+        wrapper = self.wrapper
+        if wrapper._guard is not None:
+            wrapper._guard.check_pop(wrapper, self)
+        assert wrapper.current is self
+        stack = wrapper._stack
+        stack.pop()
+        wrapper._version = next(_versions)
+        if wrapper._recorder is not None:
+            wrapper._recorder.record_pop(stack)
+        wrapper.context_exited(context_vars=self)
+
+
+class ContextReader:
+    """
+    Reads a fixed list of context vars in a single pass over the stack.
+
+    Do not create this directly, use RuntimeContextWrapper.reader().
+    """
+
+    def __init__(self, wrapper: 'RuntimeContextWrapper', names, defaults=None, named=False):
+        self.wrapper = wrapper
+        self.names = tuple(names)
+        if defaults is None:
+            defaults = {}
+        if isinstance(defaults, dict):
+            self._defaults = tuple(defaults.get(name) for name in self.names)
+        else:
+            self._defaults = tuple(defaults)
+            if len(self._defaults) != len(self.names):
+                raise ValueError('Expected {} defaults, got {}'.format(len(self.names), len(self._defaults)))
+        self._indexes = {name: i for i, name in enumerate(self.names)}
+        self._make = collections.namedtuple('ContextValues', self.names)._make if named else tuple
+
+    def __call__(self):
+        values = list(self._defaults)
+        pending = self._indexes.copy()
+        for ctx in reversed(self.wrapper._stack):
+            if len(ctx) < len(pending):
+                for name in ctx:
+                    i = pending.pop(name, None)
+                    if i is not None:
+                        value = ctx[name]
+                        values[i] = value.resolve(ctx, name) if value.__class__ is Lazy else value
+            else:
+                for name in [name for name in pending if name in ctx]:
+                    value = ctx[name]
+                    values[pending.pop(name)] = value.resolve(ctx, name) if value.__class__ is Lazy else value
+            if not pending:
+                break
+        return self._make(values)
+
+    def __repr__(self):
+        return '<{} {}>'.format(self.__class__.__name__, ', '.join(self.names))
+
+
+def _import_wrapper(module_name, name) -> 'RuntimeContextWrapper':
+    value = getattr(importlib.import_module(module_name), name)
+    if isinstance(value, RuntimeContextWrapper):
+        return value
+    return type(value).runtime_context
 
 
 class RuntimeContextWrapper:
@@ -46,19 +300,50 @@ class RuntimeContextWrapper:
     """
 
     _internals_ = (
-        '_stack',
-        '_hookery',
+        '_base_stack',
+        '_stack_var',
+        '_version',
+        '_shared_version',
+        '_recorder',
+        '_guard',
+        '_location',
+        '_base_depth',
         'context_entered',
         'context_exited',
     )
 
     def __init__(self):
         # Stack is wrapper-instance specific, so there can be multiple unrelated stacks per thread.
-        self._stack = _thread_local.stack[self]
+        self._base_stack = _base_stacks[self]
+
+        # The stack actually in use. Threads and asyncio tasks that need their own stack
+        # install a copy of it here, see isolated().
+        self._stack_var = (ContextVar or _ThreadVar)('runtime_context_stack', default=self._base_stack)
 
-        self._hookery = Registry()
-        self.context_entered = self._hookery.register_event('context_entered')
-        self.context_exited = self._hookery.register_event('context_exited')
+        # Changes whenever a context is pushed or popped or a var is set or reset,
+        # so that anything derived from the stack can be cached until the next change.
+        self._version = next(_versions)
+
+        # Changes whenever a var is set or reset in a context that is in more than one stack.
+        # Together with the top context's _version, it tells whether anything in a stack has changed
+        # since a context was pushed, without walking the stack (see runtime_context.log).
+        self._shared_version = 0
+
+        # Optional runtime_context.recorder.Recorder of stack transitions
+        self._recorder = None
+
+        # Optional runtime_context.guard.StackGuard
+        self._guard = None
+
+        # (module name, attribute name) that this wrapper is pickled as, found on first pickling
+        self._location = None
+
+        # Number of frames at the bottom of the stack that are never popped: the context
+        # pushed below and read-only layers attached under it (see runtime_context.shared).
+        self._base_depth = 1
+
+        self.context_entered = Event('context_entered')
+        self.context_exited = Event('context_exited')
 
         # It simplifies life a lot if there is always one context present for each wrapper.
         self.push_context()
@@ -86,27 +371,158 @@ class RuntimeContextWrapper:
         else:
             return object.__delattr__(self, name)
 
+    @property
+    def _stack(self):
+        return self._stack_var.get()
+
+    def isolated(self):
+        """
+        Returns a context manager under which the current thread or asyncio task
+        works with its own copy of the stack. Contexts pushed and popped inside
+        are not seen by other threads and tasks, and vice versa.
+        Before Python 3.7 only threads are isolated, asyncio tasks of a thread share its stack.
+        """
+        return _IsolatedStack(self)
+
+    def bind_iter(self, iterable):
+        """
+        Returns an iterator over ``iterable`` which sees the stack as it is now
+        on each step, no matter where and when it is consumed.
+
+        Contexts pushed and popped by a bound generator stay on its own stack,
+        so generators can be consumed after the context they were created in
+        has exited, or interleaved with each other.
+        """
+        return _BoundIterator(self, iterable)
+
+    def bind_aiter(self, async_iterable):
+        """
+        bind_iter() for asynchronous iterables. Requires Python 3.7+, older Pythons can't isolate
+        stacks per task, and the bound stack would be seen by other tasks while the iterator awaits.
+        """
+        _require_contextvars('bind_aiter()')
+        return _BoundAsyncIterator(self, async_iterable)
+
+    def bound_generator(self, func):
+        """
+        Decorator for generator functions: each generator created by calling the function
+        is bound to the stack as it was when the function was called. See bind_iter().
+        """
+        @functools.wraps(func)
+        def bound(*args, **kwargs):
+            return _BoundIterator(self, func(*args, **kwargs))
+        return bound
+
+    def bound_async_generator(self, func):
+        """
+        bound_generator() for asynchronous generator functions. Requires Python 3.7+.
+        """
+        _require_contextvars('bound_async_generator()')
+
+        @functools.wraps(func)
+        def bound(*args, **kwargs):
+            return _BoundAsyncIterator(self, func(*args, **kwargs))
+        return bound
+
+    def map(self, fn, contexts, executor=None, chunksize=1):
+        """
+        Calls ``fn()`` inside each of ``contexts`` and yields (context, result) pairs as results come in.
+
+        A context is a dictionary of context vars, or a list of such dictionaries (frames), outermost first.
+        Contexts are reordered so that those sharing outer frames run one after another,
+        and shared frames are pushed once for all of them. See runtime_context.batch.
+
+        With ``executor`` (a concurrent.futures executor), contexts are run in its workers,
+        ``chunksize`` contexts per task, and results are yielded in the order they complete.
+        Each task re-enters the contexts the caller is in, and the values set in the base context;
+        lazy values in them are evaluated before the tasks are submitted.
+        Read-only layers attached with runtime_context.shared are not passed, worker processes
+        should attach them in an initializer. A ProcessPoolExecutor requires
+        ``fn`` to be picklable and this wrapper (or an env using it) to be a module-level name.
+        """
+        from .batch import map_contexts
+        return map_contexts(self, fn, contexts, executor=executor, chunksize=chunksize)
+
+    def __reduce__(self):
+        """
+        Wrappers are pickled by reference to the module-level name they, or an env using them,
+        are available under, so that they can be passed to worker processes.
+        """
+        if self._location is None:
+            for module_name, module in list(sys.modules.items()):
+                for name, value in list(getattr(module, '__dict__', {}).items()):
+                    if value is self or getattr(type(value), 'runtime_context', None) is self:
+                        self._location = (module_name, name)
+                        break
+                if self._location is not None:
+                    break
+            else:
+                import pickle
+                raise pickle.PicklingError(
+                    '{!r} can only be pickled if it, or an env using it, is a module-level name'.format(self)
+                )
+        return _import_wrapper, self._location
+
     def get(self, name, default=None):
         for ctx in reversed(self._stack):
             if name in ctx:
-                return ctx[name]
+                value = ctx[name]
+                if value.__class__ is Lazy:
+                    return value.resolve(ctx, name)
+                return value
         return default
 
+    def get_many(self, names, defaults=None) -> tuple:
+        """
+        Returns a tuple of values of all ``names``, looked up in one pass over the stack.
+        ``defaults`` is either a dictionary or a sequence of the same length as ``names``.
+        """
+        return ContextReader(self, names, defaults)()
+
+    def reader(self, names, defaults=None, named=False) -> ContextReader:
+        """
+        Returns a callable that does what get_many() does, for a fixed list of names.
+        Create it once and call it in hot code. If ``named`` is True, values are
+        returned as a named tuple.
+        """
+        return ContextReader(self, names, defaults, named=named)
+
     def set(self, name, value):
-        self.current[name] = value
+        stack = self._stack
+        current = stack[-1]
+        current[name] = value
+        current._version = self._version = next(_versions)
+        if current._shared:
+            self._shared_version = self._version
+        if self._recorder is not None:
+            self._recorder.record_set(stack, name)
 
     def reset(self, name):
         """
         Resets the value of a var in the current context.
         """
-        if name in self.current:
-            del self.current[name]
+        stack = self._stack
+        current = stack[-1]
+        if name in current:
+            del current[name]
+            current._version = self._version = next(_versions)
+            if current._shared:
+                self._shared_version = self._version
+            if self._recorder is not None:
+                self._recorder.record_reset(stack, name)
 
     def reset_context(self):
         """
         Clears current context state
         """
-        self.current.clear()
+        stack = self._stack
+        current = stack[-1]
+        current.clear()
+        current._version = self._version = next(_versions)
+        if current._shared:
+            self._shared_version = self._version
+        if self._recorder is not None:
+            self._recorder.record_reset(stack, None)
 
     def push_context(self, context_vars_dict=None, **context_vars):
         self.new_context(context_vars_dict=context_vars_dict, **context_vars)._push_context()
@@ -114,6 +530,23 @@ class RuntimeContextWrapper:
     def pop_context(self):
         self.current._pop_context()
 
+    def _copy_stack(self):
+        """
+        Returns a copy of the stack in use, for a thread, task or iterator to work with on its own.
+        Its frames are then in more than one stack, so changes to them also change _shared_version.
+        """
+        stack = self._stack
+        for frame in stack:
+            frame._shared = True
+        return list(stack)
+
+    @property
+    def depth(self):
+        """
+        Number of contexts in the stack, including the one pushed on wrapper creation.
+        """
+        return len(self._stack)
+
     @property
     def current(self):
         if not self._stack:
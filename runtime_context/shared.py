@@ -0,0 +1,202 @@
+"""
+Read-only context snapshots in shared memory, for process pool workers.
+
+In the parent::
+
+    snapshot = export_snapshot(env)             # or export_snapshot(env, names=['flags', 'tenants'])
+    pool = ProcessPoolExecutor(initializer=attach_snapshot, initargs=(env, snapshot.name))
+    ...
+    snapshot.close()
+    snapshot.unlink()
+
+In each worker, ``attach_snapshot()`` puts a SharedContextView at the bottom of the
+wrapper's stack. Values are unpickled straight from shared memory the first time
+they are read, and cached in the worker.
+
+Layout of the shared memory block (all integers little-endian)::
+
+    header   magic b'RCSS', format version (uint32), number of vars (uint32)
+    index    per var: key offset (uint64), key length (uint32), value offset (uint64), value length (uint32)
+    data     keys (UTF-8) and values (pickled), at the offsets given in the index
+
+Requires Python 3.8+.
+"""
+import collections.abc
+import pickle
+import struct
+from multiprocessing import shared_memory
+
+from .env import EnvBase, _get_wrapper
+from .runtime_context import _versions
+
+MAGIC = b'RCSS'
+FORMAT_VERSION = 1
+
+_header = struct.Struct('<4sII')
+_entry = struct.Struct('<QIQI')
+
+
+def _open_shared_memory(name) -> shared_memory.SharedMemory:
+    """
+    Attaches to an existing block, without registering it with the resource tracker where possible.
+    Before Python 3.13 it is always registered, which is harmless in multiprocessing workers
+    as they share the resource tracker of the parent, but a process that isn't started by
+    multiprocessing unlinks the block when it exits.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedSnapshot:
+    """
+    A snapshot written to shared memory by export_snapshot(). Owned by the process
+    that created it, which should close() and unlink() it when workers are done with it.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, names):
+        self._shm = shm
+        self.names = tuple(names)
+
+    @property
+    def name(self):
+        """
+        Name of the shared memory block, to pass to workers.
+        """
+        return self._shm.name
+
+    @property
+    def size(self):
+        return self._shm.size
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        self.unlink()
+
+
+def export_snapshot(runtime_context, names=None) -> SharedSnapshot:
+    """
+    Writes the current values of context vars ``names`` (by default, all vars in the stack)
+    of a RuntimeContextWrapper or an env to a new shared memory block.
+    Values must be picklable. Lazy values are evaluated.
+    """
+    wrapper = _get_wrapper(runtime_context)
+    if names is None:
+        names = []
+        for ctx in wrapper._stack:
+            names.extend(name for name in ctx if name not in names)
+    names = tuple(names)
+
+    if isinstance(runtime_context, EnvBase):
+        values = runtime_context.read(*names)
+    else:
+        values = wrapper.get_many(names)
+
+    keys = [name.encode('utf-8') for name in names]
+    pickled = [pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL) for value in values]
+
+    offset = _header.size + _entry.size * len(names)
+    index = []
+    for key, value in zip(keys, pickled):
+        index.append((offset, len(key), offset + len(key), len(value)))
+        offset += len(key) + len(value)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    buf = shm.buf
+    _header.pack_into(buf, 0, MAGIC, FORMAT_VERSION, len(names))
+    for i, (key_offset, key_length, value_offset, value_length) in enumerate(index):
+        _entry.pack_into(buf, _header.size + _entry.size * i, key_offset, key_length, value_offset, value_length)
+        buf[key_offset:key_offset + key_length] = keys[i]
+        buf[value_offset:value_offset + value_length] = pickled[i]
+    del buf
+
+    return SharedSnapshot(shm, names)
+
+
+class SharedContextView(collections.abc.Mapping):
+    """
+    Read-only mapping over a snapshot in shared memory. Only keys are decoded
+    when it is opened, each value is unpickled on first access.
+    """
+
+    def __init__(self, name):
+        self._shm = _open_shared_memory(name)
+        buf = self._shm.buf
+        magic, version, count = _header.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._shm.close()
+            raise ValueError('{!r} is not a runtime context snapshot of format version {}'.format(name, FORMAT_VERSION))
+
+        # name -> (value offset, value length)
+        self._index = {}
+        for i in range(count):
+            key_offset, key_length, value_offset, value_length = _entry.unpack_from(buf, _header.size + _entry.size * i)
+            key = bytes(buf[key_offset:key_offset + key_length]).decode('utf-8')
+            self._index[key] = (value_offset, value_length)
+
+        self._values = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            offset, length = self._index[name]
+            value = self._values[name] = pickle.loads(self._shm.buf[offset:offset + length])
+            return value
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        self._values.clear()
+        self._shm.close()
+
+    def __repr__(self):
+        return '<{} {!r} {}>'.format(self.__class__.__name__, self._shm.name, sorted(self._index))
+
+
+def attach_snapshot(runtime_context, name) -> SharedContextView:
+    """
+    Opens the snapshot ``name`` and attaches it as a read-only layer at the bottom of the stack
+    of a RuntimeContextWrapper or an env. Everything in the stack, including values set
+    in the base context, takes precedence over it.
+
+    Attach before any stacks are isolated (for example, in a process pool initializer),
+    as isolated stacks are copies taken when they were isolated.
+    """
+    view = SharedContextView(name)
+    wrapper = _get_wrapper(runtime_context)
+    wrapper._base_stack.insert(0, view)
+    wrapper._base_depth += 1
+    wrapper._shared_version = wrapper._version = next(_versions)
+    return view
+
+
+def detach_snapshot(runtime_context, view: SharedContextView):
+    """
+    Removes a view attached with attach_snapshot() and closes it.
+    """
+    wrapper = _get_wrapper(runtime_context)
+    for i, layer in enumerate(wrapper._base_stack):
+        if layer is view:
+            del wrapper._base_stack[i]
+            wrapper._base_depth -= 1
+            wrapper._shared_version = wrapper._version = next(_versions)
+            break
+    view.close()
@@ -24,9 +24,7 @@ setup(
     description='Runtime context',
     long_description=read('README.rst'),
     packages=['runtime_context'],
-    install_requires=[
-        'hookery >=2.2.0, <3.0.0',
-    ],
+    install_requires=[],
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
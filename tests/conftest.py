@@ -1,7 +1,12 @@
+import sys
+
 import pytest
 
 from runtime_context import RuntimeContextWrapper
 
+# Uses syntax and asyncio features of Python 3.7+
+collect_ignore = ['test_runtime_context_async.py'] if sys.version_info < (3, 7) else []
+
 
 @pytest.fixture(autouse=True)
 def rc():
@@ -0,0 +1,143 @@
+import concurrent.futures
+import multiprocessing
+import pickle
+
+import pytest
+
+from runtime_context import RuntimeContextWrapper, lazy, runtime_context_env
+from runtime_context.batch import order_contexts
+
+
+@runtime_context_env
+class Env:
+    region = None
+    tenant = None
+    dry_run = False
+
+
+env = Env()
+
+pushes = []
+
+
+@env.context_var_set.listener
+def record_set(name):
+    pushes.append((name, env.get(name)))
+
+
+def job():
+    return env.region, env.tenant, env.dry_run
+
+
+def test_order_contexts_groups_shared_outer_frames():
+    contexts = [
+        [{'region': 'eu'}, {'tenant': 'a'}],
+        [{'region': 'us'}, {'tenant': 'b'}],
+        {'tenant': 'c'},
+        [{'region': 'eu'}, {'tenant': 'd'}],
+        [{'region': 'us'}, {'tenant': 'e'}],
+    ]
+    ordered = order_contexts(contexts)
+    assert [index for index, _ in ordered] == [0, 3, 1, 4, 2]
+    assert ordered[0][1][0] is ordered[1][1][0]
+
+
+def test_map_pushes_shared_frames_once():
+    del pushes[:]
+    contexts = [[{'region': r}, {'tenant': t}] for t in ['a', 'b'] for r in ['eu', 'us']]
+
+    with env(dry_run=True):
+        results = list(env.runtime_context.map(job, contexts))
+
+    assert [result for _, result in results] == [
+        ('eu', 'a', True), ('eu', 'b', True), ('us', 'a', True), ('us', 'b', True),
+    ]
+    assert [context for context, _ in results] == [contexts[0], contexts[2], contexts[1], contexts[3]]
+    assert [value for name, value in pushes if name == 'region'] == ['eu', 'us']
+    assert [value for name, value in pushes if name == 'tenant'] == ['a', 'b', 'a', 'b']
+    assert env.runtime_context.depth == 1
+
+
+def test_map_results_are_consumed_outside_of_contexts(rc):
+    for context, result in rc.map(lambda: rc.get('x'), [{'x': 1}, {'x': 2}]):
+        assert result == context['x']
+        assert rc.get('x') is None
+        assert rc.depth == 1
+
+
+def test_vars_set_by_function_do_not_leak_to_next_context(rc):
+    def fn():
+        seen = rc.get('leak')
+        rc.set('leak', True)
+        return seen
+
+    results = rc.map(fn, [[{'shared': 1}, {}], [{'shared': 1}, {}], [{'shared': 1}, {}]])
+    assert [result for _, result in results] == [None, None, None]
+
+
+def test_map_does_not_share_frames_with_equal_values_of_different_types(rc):
+    contexts = [{'x': 1}, {'x': True}, {'x': 1.0}, [{'x': (1,)}, {}], [{'x': (True,)}, {}], [{'x': [1]}, {}]]
+    results = list(rc.map(lambda: rc.get('x'), contexts))
+    assert [result for _, result in results] == [1, True, 1.0, (1,), (True,), [1]]
+    assert [repr(result) for _, result in results] == ['1', 'True', '1.0', '(1,)', '(True,)', '[1]']
+
+    assert len({id(path[0]) for _, path in order_contexts(contexts)}) == 6
+
+
+def test_map_with_thread_pool():
+    contexts = [[{'region': r}, {'tenant': t}] for r in ['eu', 'us'] for t in 'abcdefgh']
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        with env(dry_run=True):
+            results = list(env.runtime_context.map(job, contexts, executor=executor, chunksize=3))
+            assert env.runtime_context.depth == 2
+
+    assert sorted(result for _, result in results) == sorted(
+        (context[0]['region'], context[1]['tenant'], True) for context in contexts
+    )
+    assert all(result == (context[0]['region'], context[1]['tenant'], True) for context, result in results)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='requires fork')
+def test_map_with_process_pool():
+    contexts = [{'tenant': t} for t in 'abcd']
+    executor = concurrent.futures.ProcessPoolExecutor(2, mp_context=multiprocessing.get_context('fork'))
+    with executor:
+        with env(region='eu'):
+            results = list(env.runtime_context.map(job, contexts, executor=executor))
+
+    assert sorted(result for _, result in results) == [('eu', t, False) for t in 'abcd']
+
+
+def load_region():
+    return 'lazy-eu'
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='requires fork')
+def test_map_with_process_pool_evaluates_lazy_values_of_caller():
+    contexts = [{'tenant': t} for t in 'ab']
+    executor = concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork'))
+    with executor:
+        with env(region=lazy(load_region)):
+            results = list(env.runtime_context.map(job, contexts, executor=executor))
+
+    assert sorted(result for _, result in results) == [('lazy-eu', t, False) for t in 'ab']
+
+
+def test_map_with_spawned_process_pool_passes_base_context():
+    contexts = [{'tenant': t} for t in 'ab']
+    executor = concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn'))
+    env.region = 'eu'
+    try:
+        with executor:
+            results = list(env.runtime_context.map(job, contexts, executor=executor))
+    finally:
+        del env.region
+
+    assert sorted(result for _, result in results) == [('eu', t, False) for t in 'ab']
+
+
+def test_wrapper_is_pickled_by_reference():
+    assert pickle.loads(pickle.dumps(env.runtime_context)) is env.runtime_context
+
+    with pytest.raises(pickle.PicklingError):
+        pickle.dumps(RuntimeContextWrapper())
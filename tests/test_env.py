@@ -3,7 +3,7 @@ from typing import Union  # noqa
 
 import pytest
 
-from runtime_context import EnvBase, runtime_context_env  # noqa
+from runtime_context import EnvBase, Lazy, lazy, runtime_context_env  # noqa
 
 
 @pytest.fixture
@@ -307,3 +307,155 @@ def test_single_context_var_reset_triggers_reset_event(xy_app):
 
     # a new reset isn't triggered because x was no longer in the context
     assert ['x', 'x'] == resets
+
+
+def test_read_and_reader(xy_app):
+    reader = xy_app.reader('x', 'y')
+    named_reader = xy_app.reader('y', 'x', named=True)
+
+    assert xy_app.read('x', 'y') == (1, 2)
+    assert reader() == (1, 2)
+
+    with xy_app(x=11):
+        assert xy_app.read('x', 'y') == (11, 2)
+        assert reader() == (11, 2)
+        assert named_reader().x == 11
+
+        xy_app.y = 22
+        assert named_reader() == (22, 11)
+
+    assert reader() == (1, 2)
+
+    with pytest.raises(AttributeError):
+        xy_app.read('x', 'z')
+
+
+def test_lazy_values_and_listeners_can_avoid_forcing_them(xy_app):
+    calls = []
+    events = []
+
+    def factory():
+        calls.append(1)
+        return 100
+
+    @xy_app.context_var_set.listener(predicate=lambda lazy: not lazy)
+    def eager_listener(name):
+        events.append((name, xy_app.get(name)))
+
+    with xy_app(x=lazy(factory)):
+        assert calls == []
+        assert events == []
+
+        assert xy_app.x == 100
+        assert xy_app.read('x', 'y') == (100, 2)
+        assert calls == [1]
+
+        xy_app.set_lazy('y', lambda: 200)
+        assert events == []
+        assert xy_app.y == 200
+
+        xy_app.y = 300
+        assert events == [('y', 300)]
+
+    assert xy_app.x == 1
+
+
+@pytest.fixture
+def changes_app():
+    @runtime_context_env(changes_only=True)
+    class App:
+        x = 1
+        y = 2
+
+    app = App()
+    events = []
+
+    @app.context_var_set.listener
+    def on_set(name, old_value, new_value):
+        events.append(('set', name, old_value, new_value))
+
+    @app.context_var_reset.listener
+    def on_reset(name, old_value, new_value):
+        events.append(('reset', name, old_value, new_value))
+
+    yield app, events
+
+
+def test_changes_only_push_and_pop(changes_app):
+    app, events = changes_app
+
+    with app(x=1, y=3):
+        assert events == [('set', 'y', 2, 3)]
+        with app(y=3):
+            assert events == [('set', 'y', 2, 3)]
+        assert events == [('set', 'y', 2, 3)]
+
+    assert events == [('set', 'y', 2, 3), ('reset', 'y', 3, 2)]
+    assert app.y == 2
+
+
+def test_changes_only_set_and_reset(changes_app):
+    app, events = changes_app
+
+    with app(x=5):
+        del events[:]
+        with app():
+            app.x = 5
+            assert events == []
+
+            app.x = 6
+            assert events == [('set', 'x', 5, 6)]
+
+            del app.x
+            assert events == [('set', 'x', 5, 6), ('reset', 'x', 6, 5)]
+
+            # Nothing to reset in the current context
+            del app.x
+            assert len(events) == 2
+
+        assert len(events) == 2
+
+
+def test_changes_only_compares_by_equality_and_does_not_force_lazy(changes_app):
+    app, events = changes_app
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return 1
+
+    with app(x=[1, 2]):
+        with app(x=[1, 2]):
+            pass
+    assert [e[0] for e in events] == ['set', 'reset']
+
+    del events[:]
+    with app(x=lazy(factory)):
+        assert len(events) == 1
+        assert isinstance(events[0][3], Lazy)
+    assert calls == []
+    assert len(events) == 2
+
+
+def test_changes_only_listeners_without_values(changes_app):
+    app, _ = changes_app
+    names = []
+
+    @app.context_var_set.listener
+    def on_set(name):
+        names.append(name)
+
+    with app(x=1, y=5):
+        pass
+    assert names == ['y']
+
+
+def test_changes_only_with_undeclared_var(changes_app):
+    app, events = changes_app
+
+    with app(undeclared=1):
+        assert app.runtime_context.depth == 2
+        assert events == [('set', 'undeclared', None, 1)]
+
+    assert app.runtime_context.depth == 1
+    assert events == [('set', 'undeclared', None, 1), ('reset', 'undeclared', 1, None)]
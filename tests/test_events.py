@@ -0,0 +1,142 @@
+import functools
+
+import pytest
+
+from runtime_context.events import Event
+
+
+def test_listeners_are_passed_only_arguments_they_declare():
+    event = Event('test')
+    calls = []
+
+    @event.listener
+    def no_args():
+        calls.append(('no_args',))
+
+    @event.listener
+    def name_only(name):
+        calls.append(('name_only', name))
+
+    @event.listener
+    def any_args(**kwargs):
+        calls.append(('any_args', kwargs))
+
+    event.listener(lambda name, value: calls.append(('lambda', name, value)))
+
+    event(name='x', value=1)
+    assert calls == [
+        ('no_args',),
+        ('name_only', 'x'),
+        ('any_args', {'name': 'x', 'value': 1}),
+        ('lambda', 'x', 1),
+    ]
+    assert [listener.__name__ for listener in event.listeners] == ['no_args', 'name_only', 'any_args', '<lambda>']
+
+
+def test_listener_predicates():
+    event = Event('test')
+    calls = []
+
+    @event.listener(predicate=lambda name: name == 'x')
+    def x_set(value):
+        calls.append(('x', value))
+
+    @event.listener(predicate=lambda **kwargs: kwargs['value'] > 1)
+    def big_value_set(name):
+        calls.append(('big', name))
+
+    event(name='x', value=1)
+    event(name='y', value=2)
+    event.trigger(name='x', value=3)
+    assert calls == [('x', 1), ('big', 'y'), ('x', 3), ('big', 'x')]
+
+
+def test_decorated_listener_can_be_called_directly():
+    event = Event('test')
+
+    @event.listener(predicate=lambda name: True)
+    def listener(name):
+        return name.upper()
+
+    assert listener(name='x') == 'X'
+    assert repr(listener) == "<EventListener 'listener'>"
+    assert repr(event) == "<Event 'test'>"
+
+
+def test_listener_added_while_event_fires_is_called_next_time():
+    event = Event('test')
+    calls = []
+
+    @event.listener
+    def add_another():
+        if not calls:
+            event.listener(lambda: calls.append('another'))
+        calls.append('add_another')
+
+    event()
+    event()
+    assert calls == ['add_another', 'add_another', 'another']
+
+
+def test_listener_params_of_methods_and_other_callables():
+    event = Event('test')
+    calls = []
+
+    class Handler:
+        def on_event(self, name):
+            calls.append(('method', name))
+
+        def __call__(self, value, *, name):
+            calls.append(('callable', value, name))
+
+    def with_prefix(prefix, name):
+        calls.append((prefix, name))
+
+    event.listener(Handler().on_event)
+    event.listener(Handler())
+    event.listener(functools.partial(with_prefix, 'partial'))
+
+    event(name='x', value=1)
+    assert calls == [('method', 'x'), ('callable', 1, 'x'), ('partial', 'x')]
+
+
+def test_listeners_can_be_removed():
+    event = Event('test')
+    calls = []
+
+    @event.listener
+    def first(name):
+        calls.append(('first', name))
+
+    def second(name):
+        calls.append(('second', name))
+
+    event.listener(second)
+    third = event.listener(lambda: calls.append(('third',)))
+
+    event.remove(second)
+    event(name='x')
+    assert calls == [('first', 'x'), ('third',)]
+
+    # Removing from the listeners list directly, as with hookery, works too
+    event.listeners.remove(first)
+    del calls[:]
+    event(name='y')
+    assert calls == [('third',)]
+
+    event.remove(third)
+    del calls[:]
+    event(name='z')
+    assert calls == []
+
+    with pytest.raises(ValueError):
+        event.remove(second)
+
+
+def test_registry_stand_in():
+    from runtime_context.env import Registry
+
+    registry = Registry()
+    event = registry.register_event('test')
+    assert registry.events == {'test': event}
+    assert isinstance(event, Event)
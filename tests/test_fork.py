@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from runtime_context import runtime_context_env
+from runtime_context.fork import disable_fork_reset, enable_fork_reset, reset_stacks
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork()')
+
+
+@pytest.fixture
+def env():
+    @runtime_context_env
+    class Env:
+        tenant = None
+        region = None
+
+    env = Env()
+    yield env
+    disable_fork_reset()
+
+
+def run_in_child(func):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            os.write(write_fd, json.dumps(func()).encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        result = json.loads(f.read())
+    os.waitpid(pid, 0)
+    return result
+
+
+def test_child_starts_with_base_context_only(env):
+    enable_fork_reset()
+    env.region = 'eu'
+
+    with env(tenant='acme'):
+        with env.runtime_context.isolated():
+            with env(region='us'):
+                child = run_in_child(lambda: [env.runtime_context.depth, env.tenant, env.region])
+                assert (env.tenant, env.region) == ('acme', 'us')
+
+    assert child == [1, None, 'eu']
+
+
+def test_fork_reset_can_be_disabled(env):
+    enable_fork_reset()
+    disable_fork_reset()
+
+    with env(tenant='acme'):
+        child = run_in_child(lambda: [env.runtime_context.depth, env.tenant])
+
+    assert child == [2, 'acme']
+
+
+def test_reset_stacks(env):
+    env.runtime_context.push_context(tenant='acme')
+    reset_stacks()
+    assert env.runtime_context.depth == 1
+    assert env.tenant is None
@@ -0,0 +1,88 @@
+import pytest
+
+from runtime_context import runtime_context_env
+from runtime_context.guard import StackGuard
+
+
+def test_max_depth_is_enforced(rc):
+    StackGuard(max_depth=3).attach(rc)
+
+    rc.push_context(a=1)
+    rc.push_context(b=2)
+    with pytest.raises(RuntimeError) as exc_info:
+        rc.push_context(c=3)
+    assert "['b']" in str(exc_info.value)
+    assert rc.depth == 3
+
+    rc.pop_context()
+    rc.pop_context()
+    assert rc.depth == 1
+
+
+def test_unbalanced_pops_raise(rc):
+    StackGuard().attach(rc)
+
+    with pytest.raises(RuntimeError):
+        rc.pop_context()
+    assert rc.depth == 1
+
+    outer = rc(x=1)
+    outer.__enter__()
+    rc.push_context(y=2)
+    with pytest.raises(RuntimeError):
+        outer.__exit__(None, None, None)
+    assert rc.depth == 3
+
+
+def test_max_depth_seen(rc):
+    guard = StackGuard()
+    guard.attach(rc)
+
+    with rc():
+        with rc():
+            assert rc.depth == 3
+    assert rc.depth == 1
+    assert guard.max_depth_seen == 3
+
+
+def test_leak_report_lists_contexts_still_on_stack(rc):
+    guard = StackGuard(debug=True, sample_every=2)
+    guard.attach(rc)
+
+    with rc(a=1):
+        pass
+    rc.push_context(b=2)
+    rc.push_context(c=3)
+
+    report = guard.leak_report(older_than=0)
+    assert [(leaked.names, leaked.depth) for leaked in report] == [(['b'], 2), (['c'], 3)]
+    assert all(__file__ in leaked.pushed_from for leaked in report)
+    assert report[0].stack is None  # second push, not sampled
+    assert report[1].stack is not None
+
+    assert guard.leak_report(older_than=3600) == []
+
+    rc.pop_context()
+    rc.pop_context()
+    assert guard.leak_report(older_than=0) == []
+
+
+def test_guard_can_be_attached_to_env():
+    @runtime_context_env
+    class Env:
+        x = None
+
+    env = Env()
+    guard = StackGuard(max_depth=2)
+    guard.attach(env)
+
+    with env(x=1):
+        with pytest.raises(RuntimeError):
+            with env(x=2):
+                pass
+        assert env.x == 1
+
+    guard.detach(env)
+    with env(x=1):
+        with env(x=2):
+            assert env.x == 2
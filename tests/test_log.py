@@ -0,0 +1,140 @@
+import logging
+import threading
+
+import pytest
+
+from runtime_context import runtime_context_env
+from runtime_context.log import ContextFilter, install_record_factory
+
+
+def make_record():
+    return logging.LogRecord('test', logging.INFO, __file__, 1, 'hello', None, None)
+
+
+def test_context_filter_sets_record_attributes(rc):
+    context_filter = ContextFilter(rc, {'tenant': 'tenant', 'request_id': 'rid'}, default='-', string_attr='context')
+
+    record = make_record()
+    assert context_filter.filter(record) is True
+    assert (record.tenant, record.rid, record.context) == ('-', '-', 'tenant=- rid=-')
+
+    with rc(tenant='acme'):
+        with rc(request_id=1):
+            record = make_record()
+            context_filter.filter(record)
+            assert (record.tenant, record.rid, record.context) == ('acme', 1, 'tenant=acme rid=1')
+
+            rc.tenant = 'other'
+            record = make_record()
+            context_filter.filter(record)
+            assert (record.tenant, record.rid) == ('other', 1)
+
+            rc.reset('tenant')
+            record = make_record()
+            context_filter.filter(record)
+            assert (record.tenant, record.rid) == ('acme', 1)
+
+        record = make_record()
+        context_filter.filter(record)
+        assert (record.tenant, record.rid) == ('acme', '-')
+
+
+def test_context_filter_uses_env_defaults():
+    @runtime_context_env
+    class Env:
+        tenant = 'default-tenant'
+        dry_run = False
+
+    env = Env()
+    context_filter = ContextFilter(env, ['tenant', 'dry_run'])
+
+    assert context_filter.values() == {'tenant': 'default-tenant', 'dry_run': False}
+    with env(dry_run=True):
+        assert context_filter.values() == {'tenant': 'default-tenant', 'dry_run': True}
+    assert context_filter.values() == {'tenant': 'default-tenant', 'dry_run': False}
+
+
+def test_context_filter_values_are_cached_until_context_changes(rc):
+    context_filter = ContextFilter(rc, ['tenant'])
+
+    with rc(tenant='acme'):
+        values = context_filter.values()
+        assert context_filter.values() is values
+
+        with rc():
+            inner_values = context_filter.values()
+            assert inner_values is not values
+            assert inner_values == {'tenant': 'acme'}
+            assert context_filter.values() is inner_values
+
+        assert context_filter.values() == {'tenant': 'acme'}
+
+
+def test_context_filter_cache_is_per_frame(rc):
+    context_filter = ContextFilter(rc, ['tenant'])
+    calls = []
+    reader = context_filter._reader
+    context_filter._reader = lambda: calls.append(1) or reader()
+
+    def request(tenant):
+        with rc(tenant=tenant):
+            yield
+            for _ in range(10):
+                assert context_filter.values() == {'tenant': tenant}
+                yield
+            rc.set('tenant', tenant + '!')
+            yield
+            assert context_filter.values() == {'tenant': tenant + '!'}
+            yield
+
+    requests = [rc.bind_iter(request(tenant)) for tenant in ('a', 'b')]
+    for _ in range(14):
+        for r in requests:
+            next(r, None)
+
+    # Once per request, and once more after each request's set()
+    assert len(calls) == 4
+
+    # A set in the base context, which is shared, invalidates the caches above it
+    with rc.isolated():
+        with rc(request_id=1):
+            assert context_filter.values() == {'tenant': None}
+            thread = threading.Thread(target=rc.set, args=('tenant', 'x'))
+            thread.start()
+            thread.join()
+            assert context_filter.values() == {'tenant': 'x'}
+
+    # A set in a context of another stack doesn't
+    calls[:] = []
+    with rc.isolated():
+        with rc(request_id=2):
+            assert context_filter.values() == {'tenant': 'x'}
+
+            def other_request():
+                with rc.isolated():
+                    with rc(request_id=3):
+                        rc.set('tenant', 'y')
+
+            thread = threading.Thread(target=other_request)
+            thread.start()
+            thread.join()
+            assert context_filter.values() == {'tenant': 'x'}
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def restore_record_factory():
+    original_factory = logging.getLogRecordFactory()
+    yield
+    logging.setLogRecordFactory(original_factory)
+
+
+def test_install_record_factory(rc, restore_record_factory):
+    install_record_factory(rc, ['tenant'])
+
+    with rc(tenant='acme'):
+        record = logging.getLogger('test').makeRecord('test', logging.INFO, __file__, 1, 'hello', None, None)
+        assert record.tenant == 'acme'
+
+    record = logging.getLogger('test').makeRecord('test', logging.INFO, __file__, 1, 'hello', None, None)
+    assert record.tenant is None
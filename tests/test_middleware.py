@@ -0,0 +1,166 @@
+import asyncio
+import sys
+import threading
+
+import pytest
+
+import runtime_context.runtime_context
+from runtime_context import RuntimeContextWrapper, runtime_context_env
+from runtime_context.middleware import ASGIMiddleware, WSGIMiddleware
+
+
+def test_wsgi_middleware_maps_headers_and_environ_to_context_vars(rc):
+    seen = []
+
+    def app(environ, start_response):
+        seen.append((rc.get('tenant'), rc.get('content_type'), rc.get('method'), len(rc._stack)))
+        start_response('200 OK', [])
+        return [b'ok']
+
+    wrapped = WSGIMiddleware(
+        app, rc,
+        headers={'X-Tenant': 'tenant', 'Content-Type': 'content_type'},
+        environ={'REQUEST_METHOD': 'method'},
+    )
+
+    environ = {'HTTP_X_TENANT': 'acme', 'CONTENT_TYPE': 'text/plain', 'REQUEST_METHOD': 'GET'}
+    assert wrapped(environ, lambda status, headers: None) == [b'ok']
+    assert wrapped({}, lambda status, headers: None) == [b'ok']
+
+    assert seen == [
+        ('acme', 'text/plain', 'GET', 2),
+        (None, None, None, 2),
+    ]
+    assert len(rc._stack) == 1
+    assert not rc.is_context_var('tenant')
+
+
+def test_wsgi_middleware_fires_env_events():
+    @runtime_context_env
+    class Env:
+        tenant = None
+
+    env = Env()
+    calls = []
+
+    @env.context_var_set.listener
+    def context_var_set(name):
+        calls.append(('set', name, env.tenant))
+
+    @env.context_var_reset.listener
+    def context_var_reset(name):
+        calls.append(('reset', name, env.tenant))
+
+    def app(environ, start_response):
+        return [env.tenant.encode()]
+
+    wrapped = WSGIMiddleware(app, env, headers={'X-Tenant': 'tenant'})
+    assert wrapped({'HTTP_X_TENANT': 'acme'}, None) == [b'acme']
+    assert calls == [('set', 'tenant', 'acme'), ('reset', 'tenant', None)]
+
+
+def test_wsgi_middleware_pops_context_when_app_raises(rc):
+    def app(environ, start_response):
+        raise ValueError()
+
+    wrapped = WSGIMiddleware(app, rc, headers={'X-Tenant': 'tenant'})
+    try:
+        wrapped({'HTTP_X_TENANT': 'acme'}, None)
+    except ValueError:
+        pass
+    assert len(rc._stack) == 1
+    assert rc.get('tenant') is None
+
+
+def test_wsgi_middleware_produces_streamed_body_in_context(rc):
+    closed = []
+
+    def body():
+        try:
+            yield rc.tenant.encode()
+            yield str(len(rc._stack)).encode()
+        finally:
+            closed.append(rc.tenant)
+
+    def app(environ, start_response):
+        return body()
+
+    wrapped = WSGIMiddleware(app, rc, headers={'X-Tenant': 'tenant'})
+    response = wrapped({'HTTP_X_TENANT': 'req'}, None)
+    assert rc.get('tenant') is None
+
+    assert next(response) == b'req'
+    response.close()
+    assert closed == ['req']
+    assert len(rc._stack) == 1
+    assert rc.get('tenant') is None
+
+    response = wrapped({'HTTP_X_TENANT': 'req'}, None)
+    assert list(response) == [b'req', b'2']
+    response.close()
+    response.close()
+    assert len(rc._stack) == 1
+
+
+def test_wsgi_middleware_isolates_threads_without_contextvars(monkeypatch):
+    monkeypatch.setattr(runtime_context.runtime_context, 'ContextVar', None)
+    wrapper = RuntimeContextWrapper()
+    assert isinstance(wrapper._stack_var, runtime_context.runtime_context._ThreadVar)
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def app(environ, start_response):
+        barrier.wait()
+        seen.append(wrapper.tenant == environ['HTTP_X_TENANT'])
+        return [b'ok']
+
+    wrapped = WSGIMiddleware(app, wrapper, headers={'X-Tenant': 'tenant'})
+    threads = [
+        threading.Thread(target=wrapped, args=({'HTTP_X_TENANT': str(i)}, None))
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == [True] * 8
+    assert len(wrapper._stack) == 1
+
+    with pytest.raises(RuntimeError):
+        ASGIMiddleware(app, wrapper)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires Python 3.7+')
+def test_asgi_middleware_isolates_concurrent_requests(rc):
+    seen = []
+
+    async def app(scope, receive, send):
+        before = rc.tenant
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        seen.append((before, rc.tenant, rc.path, len(rc._stack)))
+
+    wrapped = ASGIMiddleware(app, rc, headers={'X-Tenant': 'tenant'}, scope={'path': 'path'})
+
+    def scope(tenant):
+        return {'type': 'http', 'path': '/' + tenant, 'headers': [(b'x-tenant', tenant.encode())]}
+
+    async def main():
+        await asyncio.gather(*(wrapped(scope(t), None, None) for t in ('a', 'b', 'c')))
+
+    asyncio.run(main())
+
+    assert sorted(seen) == [('a', 'a', '/a', 2), ('b', 'b', '/b', 2), ('c', 'c', '/c', 2)]
+    assert len(rc._stack) == 1
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires Python 3.7+')
+def test_asgi_middleware_passes_lifespan_through(rc):
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append((scope['type'], len(rc._stack)))
+
+    asyncio.run(ASGIMiddleware(app, rc, headers={'X-Tenant': 'tenant'})({'type': 'lifespan'}, None, None))
+    assert calls == [('lifespan', 1)]
@@ -0,0 +1,193 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+from runtime_context import runtime_context_env
+from runtime_context.pool import PoolExhausted, ResourcePool
+
+
+class FakeConnection:
+    def __init__(self, db_name):
+        self.db_name = db_name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def env():
+    @runtime_context_env
+    class Env:
+        db_name = 'default'
+        region = 'eu'
+
+    return Env()
+
+
+def test_pool_reuses_resources_per_key(env):
+    created = []
+
+    def factory(db_name):
+        created.append(db_name)
+        return FakeConnection(db_name)
+
+    db = env.pool('db', key=('db_name',), factory=factory)
+    assert env.pool('db') is db
+
+    with db.borrow() as conn:
+        assert conn.db_name == 'default'
+
+    with env(db_name='products'):
+        with db.borrow() as conn1:
+            assert conn1.db_name == 'products'
+            with db.borrow() as conn2:
+                assert conn2.db_name == 'products'
+                assert conn2 is not conn1
+        with db.borrow() as conn3:
+            assert conn3 in (conn1, conn2)
+
+    with db.borrow() as conn:
+        assert conn.db_name == 'default'
+
+    assert created == ['default', 'products', 'products']
+    assert db.stats() == {('default',): (1, 0), ('products',): (2, 0)}
+
+
+def test_pool_requires_key_vars_and_factory(env):
+    with pytest.raises(ValueError):
+        env.pool('db')
+    with pytest.raises(AttributeError):
+        env.pool('db', key=('nope',), factory=FakeConnection)
+
+
+def test_resources_acquired_in_context_are_released_on_exit(env):
+    db = env.pool('db', key=('db_name',), factory=FakeConnection)
+
+    with env(db_name='products'):
+        conn = db.acquire()
+        assert db.stats() == {('products',): (0, 1)}
+
+        with env():
+            db.acquire()
+            assert db.stats() == {('products',): (0, 2)}
+        assert db.stats() == {('products',): (1, 1)}
+
+    assert db.stats() == {('products',): (2, 0)}
+    assert not conn.closed
+
+    # Already released on exit
+    db.release(conn)
+    assert db.stats() == {('products',): (2, 0)}
+
+
+def test_maxsize_per_key(env):
+    db = env.pool('db', key=('db_name', 'region'), factory=lambda db_name, region: FakeConnection(db_name), maxsize=1)
+
+    conn = db.acquire()
+    with pytest.raises(PoolExhausted):
+        db.acquire(timeout=0.01)
+
+    with env(region='us'):
+        with db.borrow():
+            pass
+
+    def release_later():
+        time.sleep(0.05)
+        db.release(conn)
+
+    thread = threading.Thread(target=release_later)
+    thread.start()
+    assert db.acquire(timeout=5) is conn
+    thread.join()
+
+
+def test_idle_resources_are_evicted(rc):
+    db = ResourcePool(rc, key=('db_name',), factory=FakeConnection, idle_timeout=0.01)
+
+    conn = db.acquire()
+    db.release(conn)
+    assert db.stats() == {(None,): (1, 0)}
+
+    time.sleep(0.02)
+    db.evict_idle()
+    assert conn.closed
+    assert db.stats() == {}
+
+    with db.borrow() as new_conn:
+        assert new_conn is not conn
+
+
+def test_idle_resources_are_evicted_on_acquire(rc):
+    db = ResourcePool(rc, key=('db_name',), factory=FakeConnection, idle_timeout=0.01)
+
+    with rc(db_name='a'):
+        with db.borrow() as conn:
+            pass
+
+    time.sleep(0.02)
+    with db.borrow():
+        assert conn.closed
+        assert db.stats() == {(None,): (0, 1)}
+
+
+def test_clear_closes_idle_resources(rc):
+    closed = []
+    db = ResourcePool(rc, key=('db_name',), factory=FakeConnection, close=closed.append)
+
+    with db.borrow() as conn:
+        pass
+    db.clear()
+    assert closed == [conn]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires Python 3.7+')
+def test_pool_with_asyncio(env):
+    db = env.pool('db', key=('db_name',), factory=FakeConnection, maxsize=2)
+    seen = []
+
+    async def handle(db_name):
+        with env.runtime_context.isolated():
+            with env(db_name=db_name):
+                async with db.borrow(timeout=5) as conn:
+                    await asyncio.sleep(0.01)
+                    seen.append(conn.db_name == env.db_name)
+
+    async def main():
+        await asyncio.gather(*(handle(db_name) for db_name in ['a', 'b'] * 4))
+
+    asyncio.run(main())
+    assert seen == [True] * 8
+    assert db.stats() == {('a',): (2, 0), ('b',): (2, 0)}
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires Python 3.7+')
+def test_cancelled_acquire_async_does_not_leak(env):
+    db = env.pool('db', key=('db_name',), factory=FakeConnection, maxsize=1)
+
+    async def main():
+        conn = db.acquire()
+        waiting = asyncio.ensure_future(db.acquire_async())
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        db.release(conn)
+
+        assert db.stats() == {('default',): (1, 0)}
+        assert db._async_waiters == []
+
+        with pytest.raises(PoolExhausted):
+            with db.borrow():
+                await db.acquire_async(timeout=0.01)
+        assert db.stats() == {('default',): (1, 0)}
+
+        # A waiter is woken up by a release in another thread
+        conn = db.acquire()
+        threading.Timer(0.02, db.release, args=(conn,)).start()
+        assert await db.acquire_async(timeout=5) is conn
+
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+import pickle
+import threading
+
+from runtime_context import runtime_context_env
+from runtime_context.recorder import Recorder, decode
+
+
+def test_recorder_records_transitions(rc):
+    recorder = Recorder()
+    recorder.attach(rc)
+
+    with rc(x=1, y=2):
+        rc.set('z', 3)
+        rc.reset('z')
+        rc.reset_context()
+
+    recorder.detach(rc)
+    with rc(x=1):
+        pass
+
+    events = recorder.dump()
+    assert [(e.op, e.name, e.depth) for e in events] == [
+        ('push', None, 2),
+        ('push_var', 'x', 2),
+        ('push_var', 'y', 2),
+        ('set', 'z', 2),
+        ('reset', 'z', 2),
+        ('reset', None, 2),
+        ('pop', None, 1),
+    ]
+    assert {e.thread_id for e in events} == {threading.get_ident()}
+    assert {e.stack_id for e in events} == {id(rc._stack)}
+    assert [e.timestamp for e in events] == sorted(e.timestamp for e in events)
+
+
+def test_recorder_keeps_last_records_per_thread(rc):
+    recorder = Recorder(capacity=3)
+    recorder.attach(rc)
+
+    for i in range(5):
+        rc.set('x{}'.format(i), i)
+
+    assert [e.name for e in recorder.dump()] == ['x2', 'x3', 'x4']
+
+    recorder.clear()
+    assert recorder.dump() == []
+
+
+def test_recorder_uses_buffer_per_thread(rc):
+    recorder = Recorder()
+    recorder.attach(rc)
+
+    def worker():
+        with rc.isolated():
+            with rc(x=1):
+                pass
+
+    thread = threading.Thread(target=worker, name='worker')
+    thread.start()
+    thread.join()
+    rc.set('y', 1)
+
+    events = recorder.dump()
+    assert [(e.thread_name, e.op, e.name) for e in events] == [
+        ('worker', 'push', None),
+        ('worker', 'push_var', 'x'),
+        ('worker', 'pop', None),
+        (threading.current_thread().name, 'set', 'y'),
+    ]
+    assert events[0].stack_id != events[-1].stack_id
+
+
+def test_recorder_snapshot_can_be_stored_and_decoded_later():
+    @runtime_context_env
+    class Env:
+        x = None
+
+    env = Env()
+    recorder = Recorder()
+    recorder.attach(env)
+
+    with env(x=1):
+        env.x = 2
+
+    snapshot = pickle.loads(pickle.dumps(recorder.snapshot()))
+    assert decode(snapshot) == recorder.dump()
+    assert [(e.op, e.name) for e in decode(snapshot)] == [('push', None), ('push_var', 'x'), ('set', 'x'), ('pop', None)]
+
+
+def test_recorder_reuses_buffers_of_finished_threads(rc):
+    recorder = Recorder(capacity=16, keep_finished=2)
+    recorder.attach(rc)
+
+    def worker():
+        with rc.isolated():
+            with rc(x=1):
+                pass
+
+    for i in range(20):
+        thread = threading.Thread(target=worker, name='worker-{}'.format(i))
+        thread.start()
+        thread.join()
+
+    assert len(recorder._buffers) == 3
+
+    # The last threads' records are kept
+    events = recorder.dump()
+    assert sorted({e.thread_name for e in events}) == ['worker-17', 'worker-18', 'worker-19']
+    assert len(events) == 9
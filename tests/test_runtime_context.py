@@ -1,6 +1,9 @@
+import threading
+
 import pytest
 
-from runtime_context import Context, RuntimeContextWrapper
+import runtime_context.runtime_context
+from runtime_context import Context, Lazy, RuntimeContextWrapper, lazy
 
 
 def test_rc_basics(rc):
@@ -263,3 +266,207 @@ def test_there_is_always_one_context_already_pushed_on_wrapper_creation():
     assert len(wrapper2._stack) == 1
     assert wrapper1._stack is not wrapper2._stack
     assert wrapper1.current is not wrapper2.current
+
+
+def test_isolated_stack_is_not_shared_with_other_threads(rc):
+    rc.x = 1
+    seen = []
+
+    def worker():
+        with rc.isolated():
+            with rc(x=2):
+                seen.append(rc.x)
+                started.set()
+                stop.wait()
+
+    started = threading.Event()
+    stop = threading.Event()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait()
+
+    assert rc.x == 1
+    assert len(rc._stack) == 1
+
+    stop.set()
+    thread.join()
+
+    assert seen == [2]
+    assert rc.x == 1
+
+
+def test_isolated_stack_starts_as_copy_of_current_stack(rc):
+    with rc(x=1):
+        with rc.isolated():
+            assert rc.x == 1
+            assert len(rc._stack) == 2
+            rc.push_context(x=2)
+            assert rc.x == 2
+        assert rc.x == 1
+        assert len(rc._stack) == 2
+
+
+def test_get_many_and_reader(rc):
+    assert rc.get_many(['a', 'b']) == (None, None)
+    assert rc.get_many(['a', 'b'], {'b': 5}) == (None, 5)
+    assert rc.get_many(['a', 'b'], [4, 5]) == (4, 5)
+    with pytest.raises(ValueError):
+        rc.get_many(['a', 'b'], [4])
+
+    reader = rc.reader(['a', 'b', 'c'], {'c': 0})
+    named_reader = rc.reader(['a', 'b', 'c'], named=True)
+
+    with rc(a=1, b=2, c=3, d=4):
+        with rc(b=None):
+            with rc(a=11, e=5, f=6, g=7):
+                assert rc.get_many(['a', 'b', 'c']) == (11, None, 3)
+                assert reader() == (11, None, 3)
+
+                values = named_reader()
+                assert values == (11, None, 3)
+                assert (values.a, values.b, values.c) == (11, None, 3)
+
+    assert reader() == (None, None, 0)
+
+
+def test_lazy_value_is_evaluated_once_per_context_on_first_read(rc):
+    calls = []
+
+    def load_user():
+        calls.append(1)
+        return 'user-{}'.format(len(calls))
+
+    user = lazy(load_user)
+
+    with rc(user=user):
+        assert calls == []
+        assert isinstance(rc.current['user'], Lazy)
+
+        assert rc.user == 'user-1'
+        assert rc.get('user') == 'user-1'
+        with rc():
+            assert rc.get_many(['user']) == ('user-1',)
+        assert calls == [1]
+        assert rc.current['user'] == 'user-1'
+
+    with rc(user=user):
+        assert rc.get_many(['user', 'other']) == ('user-2', None)
+        assert rc.user == 'user-2'
+
+    with rc():
+        rc.set('user', user)
+        assert rc.reader(['user'])() == ('user-3',)
+
+    assert len(calls) == 3
+
+
+def test_lazy_value_is_evaluated_once_when_read_from_many_threads(rc):
+    calls = []
+    release = threading.Event()
+
+    def factory():
+        calls.append(1)
+        release.wait()
+        return 'value'
+
+    results = []
+    with rc(x=lazy(factory)):
+        threads = [threading.Thread(target=lambda: results.append(rc.x)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    assert calls == [1]
+    assert results == ['value'] * 5
+
+
+def test_lazy_value_factory_errors_are_not_cached(rc):
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError()
+        return 'ok'
+
+    with rc(x=lazy(factory)):
+        with pytest.raises(ValueError):
+            rc.get('x')
+        assert rc.get('x') == 'ok'
+
+
+def test_lazy_value_factory_reading_itself_raises(rc):
+    with rc(x=lazy(lambda: rc.get('x') + 1), y=lazy(lambda: rc.get('z')), z=lazy(lambda: rc.get('y'))):
+        with pytest.raises(RuntimeError):
+            rc.get('x')
+        with pytest.raises(RuntimeError):
+            rc.get('y')
+
+        # Not stuck, a later read tries again
+        rc.set('z', 1)
+        assert rc.get('y') == 1
+
+
+def test_bind_iter_keeps_stack_of_creation(rc):
+    def tenant_gen():
+        for i in range(3):
+            with rc(step=i):
+                yield rc.get('tenant'), rc.get('step')
+
+    with rc(tenant='a'):
+        a = rc.bind_iter(tenant_gen())
+    with rc(tenant='b'):
+        b = rc.bind_iter(tenant_gen())
+
+    with rc(tenant='consumer'):
+        assert list(zip(a, b)) == [
+            (('a', 0), ('b', 0)),
+            (('a', 1), ('b', 1)),
+            (('a', 2), ('b', 2)),
+        ]
+        assert rc.get('tenant') == 'consumer'
+        assert len(rc._stack) == 2
+
+    assert len(rc._stack) == 1
+
+
+def test_bound_generator_can_be_closed_and_collected_unfinished(rc):
+    @rc.bound_generator
+    def gen():
+        with rc(inner=True):
+            yield rc.get('x')
+            yield rc.get('x')
+
+    with rc(x=1):
+        g = gen()
+        h = gen()
+    assert next(g) == 1
+    assert next(h) == 1
+
+    g.close()
+    del h
+    assert len(rc._stack) == 1
+    assert not rc.is_context_var('inner')
+
+
+def test_bound_generator_send(rc):
+    @rc.bound_generator
+    def echo():
+        received = yield rc.get('x')
+        while True:
+            received = yield (rc.get('x'), received)
+
+    with rc(x=1):
+        g = echo()
+    assert next(g) == 1
+    assert g.send('hello') == (1, 'hello')
+
+
+def test_async_iterators_cant_be_bound_without_contextvars(rc, monkeypatch):
+    monkeypatch.setattr(runtime_context.runtime_context, 'ContextVar', None)
+    with pytest.raises(RuntimeError):
+        rc.bind_aiter([])
+    with pytest.raises(RuntimeError):
+        rc.bound_async_generator(lambda: None)
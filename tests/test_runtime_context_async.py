@@ -0,0 +1,30 @@
+"""
+Tests that need Python 3.7+ (async generators, asyncio.run(), contextvars).
+Not collected on older Pythons, see conftest.py.
+"""
+import asyncio
+
+
+def test_bind_aiter_and_bound_async_generator(rc):
+    @rc.bound_async_generator
+    async def agen():
+        for i in range(3):
+            with rc(step=i):
+                await asyncio.sleep(0)
+                yield rc.get('tenant'), rc.get('step')
+
+    async def collect(iterator):
+        return [item async for item in iterator]
+
+    async def main():
+        with rc(tenant='a'):
+            a = agen()
+        with rc(tenant='b'):
+            b = rc.bind_aiter(agen())
+        return await asyncio.gather(collect(a), collect(b))
+
+    assert asyncio.run(main()) == [
+        [('a', 0), ('a', 1), ('a', 2)],
+        [('b', 0), ('b', 1), ('b', 2)],
+    ]
+    assert len(rc._stack) == 1
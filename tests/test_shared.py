@@ -0,0 +1,105 @@
+import concurrent.futures
+import multiprocessing
+
+import pytest
+
+from runtime_context import RuntimeContextWrapper, lazy, runtime_context_env
+
+shared = pytest.importorskip('runtime_context.shared')
+
+
+@runtime_context_env
+class Env:
+    flags = None
+    tenants = None
+    tenant = None
+
+
+env = Env()
+
+
+def read_tenant_name(tenant):
+    with env(tenant=tenant):
+        return env.tenants[env.tenant], env.flags['new_ui']
+
+
+@pytest.fixture
+def snapshot(rc):
+    with rc(flags={'new_ui': True}, tenants={'a': 'Acme', 'b': 'Bobs'}, region=lazy(lambda: 'eu')):
+        snapshot = shared.export_snapshot(rc)
+    yield snapshot
+    snapshot.close()
+    snapshot.unlink()
+
+
+def test_view_decodes_values_lazily(snapshot):
+    assert snapshot.names == ('flags', 'tenants', 'region')
+
+    view = shared.SharedContextView(snapshot.name)
+    try:
+        assert len(view) == 3
+        assert sorted(view) == ['flags', 'region', 'tenants']
+        assert 'flags' in view and 'other' not in view
+        assert view._values == {}
+
+        assert view['tenants'] == {'a': 'Acme', 'b': 'Bobs'}
+        assert list(view._values) == ['tenants']
+        assert view['tenants'] is view['tenants']
+        assert view['region'] == 'eu'
+
+        with pytest.raises(KeyError):
+            view['other']
+    finally:
+        view.close()
+
+
+def test_attached_view_is_base_layer_of_stack(snapshot):
+    worker_rc = RuntimeContextWrapper()
+    worker_rc.region = 'us'
+
+    view = shared.attach_snapshot(worker_rc, snapshot.name)
+    assert worker_rc.depth == 2
+
+    assert worker_rc.flags == {'new_ui': True}
+    assert worker_rc.region == 'us'  # base context takes precedence
+    with worker_rc(flags={}):
+        assert worker_rc.get_many(['flags', 'tenants']) == ({}, {'a': 'Acme', 'b': 'Bobs'})
+
+    shared.detach_snapshot(worker_rc, view)
+    assert worker_rc.depth == 1
+    assert not worker_rc.is_context_var('flags')
+
+
+def test_export_snapshot_of_env_with_names():
+    with env(flags={'new_ui': False}):
+        with shared.export_snapshot(env, names=['flags', 'tenant']) as snapshot:
+            view = shared.SharedContextView(snapshot.name)
+            assert dict(view) == {'flags': {'new_ui': False}, 'tenant': None}
+            view.close()
+
+
+def test_view_rejects_other_shared_memory():
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(create=True, size=64)
+    try:
+        with pytest.raises(ValueError):
+            shared.SharedContextView(shm.name)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='requires fork')
+def test_process_pool_workers_attach_snapshot():
+    with env(flags={'new_ui': True}, tenants={'a': 'Acme', 'b': 'Bobs'}):
+        snapshot = shared.export_snapshot(env, names=['flags', 'tenants'])
+
+    executor = concurrent.futures.ProcessPoolExecutor(
+        2,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=shared.attach_snapshot,
+        initargs=(env, snapshot.name),
+    )
+    with snapshot, executor:
+        assert list(executor.map(read_tenant_name, ['a', 'b'])) == [('Acme', True), ('Bobs', True)]